@@ -10,15 +10,29 @@ This script imports TSV data into the PostgreSQL database.
 Usage:
     python import_data.py --file ./SNP-disease/variant_sad_all_targets.tsv
     python import_data.py --file ./SNP-disease/variant_sad_all_targets.tsv --batch-size 1000
+    python import_data.py --file ./SNP-disease/variant_sad_all_targets.tsv --mode copy --batch-size 5000
+    python import_data.py --file ./SNP-disease/variant_sad_all_targets.tsv --mode copy --workers 4
+    python import_data.py --file ./SNP-disease/variant_sad_all_targets.tsv --mode copy --resume
+    python import_data.py --file ./SNP-disease/variant_sad_all_targets.tsv --mode copy --delta --delete-missing
+    python import_data.py --file ./SNP-disease/variant_sad_all_targets.tsv --mode copy --workers 4 --bulk-load
+    python import_data.py --file ./SNP-disease/variant_sad_all_targets.tsv --mode copy --storage vectors
 """
 
 import argparse
+import bisect
 import csv
+import functools
+import hashlib
+import io
 import os
+import re
 import sys
+import time
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
 from tqdm import tqdm
 
 from sqlalchemy import create_engine, text
@@ -26,6 +40,8 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
 import psycopg2.extras
 
+from utils import compute_file_hash, copy_field, effects_partitioned
+
 # Add project root to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -39,6 +55,28 @@ DATABASE_URL = os.getenv(
 
 TSV_FILE_PATH = "./SNP-disease/variant_sad_all_targets.tsv"
 BATCH_SIZE = 1000  # Number of records to insert per batch
+MAX_MEMORY_MB = 256  # Approximate memory ceiling for one in-flight chunk
+CHUNK_MEMORY_EXPANSION = 8  # Parsed chunk size relative to its raw bytes (rough upper bound)
+SNP_COLUMN_COUNT = 6  # chrom, pos, id, ref, alt, max_abs_sad
+EFFECT_ABS_LIMIT = 100.0  # Effect values beyond +/- this are reported as out of range
+MAX_RETRIES = 2  # Retries for a failed chunk before it is quarantined
+RETRY_BACKOFF_SECONDS = 1.0
+IMPORT_MODES = ("row", "copy")
+# rows: one snp_effects row per (SNP, target); vectors: one packed snp_effect_vectors row per SNP
+EFFECT_STORAGES = ("rows", "vectors", "both")
+
+# UNLOGGED staging tables used by the COPY loader
+STAGING_SNPS_TABLE = "snp_import_staging"
+# UNLOGGED table of SNP keys seen in the input, used by --delete-missing
+SEEN_KEYS_TABLE = "snp_import_seen_keys"
+# Chromosomes that get their own snp_effects partition; anything else (scaffolds) goes to the default one
+PARTITIONED_CHROM_PATTERN = re.compile(r'^(?:[0-9]+|X|Y|MT|M)$')
+# Tables switched to UNLOGGED and stripped of secondary indexes by --bulk-load
+BULK_LOAD_TABLES = ("snps", "snp_effects")
+# Definitions of indexes / foreign keys dropped by --bulk-load, kept until they are rebuilt
+BULK_LOAD_STATE_TABLE = "data_import_bulk_state"
+BULK_LOAD_MAINTENANCE_WORK_MEM = "512MB"  # Per-connection memory for index rebuilds
+BULK_LOAD_INDEX_WORKERS = 4  # Minimum number of connections rebuilding indexes concurrently
 
 # ============================================
 # Logging Setup
@@ -84,9 +122,9 @@ def parse_tsv_header(file_path: str) -> Tuple[List[str], List[str]]:
         header = next(reader)
 
     # First 6 columns are SNP basic info
-    snp_columns = header[:6]
+    snp_columns = header[:SNP_COLUMN_COUNT]
     # Remaining columns are effect values (targets)
-    effect_columns = header[6:]
+    effect_columns = header[SNP_COLUMN_COUNT:]
 
     logger.info(f"Found {len(snp_columns)} SNP columns: {snp_columns}")
     logger.info(f"Found {len(effect_columns)} effect value columns (targets)")
@@ -94,23 +132,321 @@ def parse_tsv_header(file_path: str) -> Tuple[List[str], List[str]]:
     return snp_columns, effect_columns
 
 
-def read_tsv_data(file_path: str) -> List[dict]:
+def build_column_index(header: List[str]) -> dict:
+    """构建 列名 -> 列下标 映射"""
+    return {name: idx for idx, name in enumerate(header)}
+
+
+def resolve_target_columns(effect_columns: List[str], target_name_to_id: dict) -> List[Tuple[int, int]]:
     """
-    读取TSV文件数据
+    将效应值列映射到靶点ID
+
+    同时兼容原始列名（如 "0986_CD4.norRPKM"）和去掉 .norRPKM 后缀的靶点名，
+    因此 --skip-targets 时从数据库加载的靶点也能正确对应到列。
 
     Returns:
-        List of dictionaries containing row data
+        [(column_index, target_id), ...]，顺序与文件列顺序一致
+    """
+    target_columns = []
+    for offset, column_name in enumerate(effect_columns):
+        target_id = target_name_to_id.get(column_name)
+        if target_id is None:
+            target_id = target_name_to_id.get(column_name.replace('.norRPKM', ''))
+        if target_id is None:
+            logger.warning(f"No target found for column {column_name}, skipping column")
+            continue
+        target_columns.append((SNP_COLUMN_COUNT + offset, target_id))
+    return target_columns
+
+
+def extract_snp_fields(fields: List[str], columns: dict) -> Optional[tuple]:
     """
-    logger.info(f"Reading TSV file: {file_path}")
+    提取并校验一行中的SNP基础字段
 
-    data_rows = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f, delimiter='\t')
-        for row in reader:
-            data_rows.append(row)
+    Returns:
+        (chrom, pos, rs_id, ref_allele, alt_allele, max_abs_sad)，缺少必填字段时返回 None
+
+    Raises:
+        ValueError: max_abs_sad 无法解析为浮点数
+    """
+    def get(name: str) -> str:
+        idx = columns.get(name)
+        return fields[idx] if idx is not None and idx < len(fields) else ''
+
+    chrom = get('chrom')
+    pos_str = get('pos')
+    pos = int(pos_str) if pos_str.isdigit() else 0
+    rs_id = get('id')
+    ref_allele = get('ref')
+    alt_allele = get('alt')
+    max_abs_sad = float(get('max_abs_sad') or 0)
+
+    if not all([chrom, pos, ref_allele, alt_allele]):
+        return None
+
+    return chrom, pos, rs_id if rs_id else None, ref_allele, alt_allele, max_abs_sad
+
+
+# ============================================
+# Streaming Pipeline: read -> parse/validate -> write
+# ============================================
+def iter_tsv_chunks(
+    file_path: str,
+    chunk_size: int = BATCH_SIZE,
+    max_chunk_bytes: int = None,
+    start_offset: int = None,
+    end_offset: int = None,
+    first_row: int = 1
+) -> Iterator[dict]:
+    """
+    按固定大小分块流式读取TSV数据行（跳过表头）
+
+    每个块在达到 chunk_size 行或 max_chunk_bytes 字节时结束，块中只保存原始行文本，
+    因此内存占用只与块大小有关，与文件总大小无关。
+
+    Args:
+        start_offset / end_offset: 只读取 [start_offset, end_offset) 字节范围（须对齐到行首），
+            默认从表头之后读到文件末尾
+        first_row: start_offset 处数据行的行号
+
+    Yields:
+        {"start_row", "end_row", "start_offset", "end_offset", "lines"}
+        行号从 1 开始（不含表头），偏移量为文件字节偏移
+    """
+    max_chunk_bytes = max_chunk_bytes or float('inf')
+
+    with open(file_path, 'rb') as f:
+        if start_offset is None:
+            start_offset = len(f.readline())
+        f.seek(start_offset)
+        offset = start_offset
+        end_offset = end_offset if end_offset is not None else float('inf')
+
+        lines = []
+        chunk_bytes = 0
+        row_num = first_row - 1
+
+        for raw_line in f:
+            if offset >= end_offset:
+                break
+            row_num += 1
+            offset += len(raw_line)
+            lines.append(raw_line.decode('utf-8').rstrip('\r\n'))
+            chunk_bytes += len(raw_line)
+
+            if len(lines) >= chunk_size or chunk_bytes >= max_chunk_bytes:
+                yield {
+                    "start_row": row_num - len(lines) + 1,
+                    "end_row": row_num,
+                    "start_offset": start_offset,
+                    "end_offset": offset,
+                    "lines": lines
+                }
+                lines = []
+                chunk_bytes = 0
+                start_offset = offset
+
+        if lines:
+            yield {
+                "start_row": row_num - len(lines) + 1,
+                "end_row": row_num,
+                "start_offset": start_offset,
+                "end_offset": offset,
+                "lines": lines
+            }
+
+
+def parse_chunk(chunk: dict, columns: dict, target_columns: List[Tuple[int, int]]) -> dict:
+    """
+    解析并校验一个数据块
+
+    SNP基础字段逐行解析；效应值块一次性解析为 float32 矩阵。
+    空效应值按 0.0 处理，无法解析的效应值在 effect_mask 中标记为 False 并计入 effects_skipped。
+
+    Returns:
+        {"start_row", "end_row", "start_offset", "end_offset",
+         "snps": [(row_num, chrom, pos, rs_id, ref_allele, alt_allele, max_abs_sad, effect_hash), ...],
+         "effects": float32 矩阵 (len(snps) x len(target_columns))，列顺序与 target_columns 一致,
+         "effect_mask": 有效单元格的 bool 矩阵，全部有效时为 None,
+         "effects_valid", "snps_skipped", "effects_skipped", "errors",
+         "lines": 原始行文本, "rejected_rows": [(row_num, line), ...] 解析失败的行}
+    """
+    parsed = {
+        "start_row": chunk["start_row"],
+        "end_row": chunk["end_row"],
+        "start_offset": chunk["start_offset"],
+        "end_offset": chunk["end_offset"],
+        "lines": chunk["lines"],
+        "rejected_rows": [],
+        "snps": [],
+        "effects": None,
+        "effect_mask": None,
+        "effects_valid": 0,
+        "snps_skipped": 0,
+        "effects_skipped": 0,
+        "errors": []
+    }
+
+    effect_width = max((column_idx for column_idx, _ in target_columns), default=SNP_COLUMN_COUNT - 1) \
+        - SNP_COLUMN_COUNT + 1
+    effect_cells = []
+
+    for row_num, line in enumerate(chunk["lines"], start=chunk["start_row"]):
+        try:
+            fields = line.split('\t')
+            snp_fields = extract_snp_fields(fields, columns)
+            if snp_fields is None:
+                logger.warning(f"Row {row_num}: Missing required SNP fields, skipping")
+                parsed["snps_skipped"] += 1
+                continue
+
+            cells = fields[SNP_COLUMN_COUNT:SNP_COLUMN_COUNT + effect_width]
+            if len(cells) < effect_width:
+                cells.extend([''] * (effect_width - len(cells)))
+
+            parsed["snps"].append((row_num,) + snp_fields)
+            effect_cells.extend(cells)
+
+        except Exception as e:
+            logger.error(f"Error processing row {row_num}: {str(e)}")
+            parsed["errors"].append(f"Row {row_num}: {str(e)}")
+            parsed["rejected_rows"].append((row_num, line))
+
+    matrix, mask = parse_effect_block(effect_cells, len(parsed["snps"]), effect_width)
+    selected = [column_idx - SNP_COLUMN_COUNT for column_idx, _ in target_columns]
+    if selected != list(range(effect_width)):
+        matrix = matrix[:, selected]
+        mask = mask[:, selected] if mask is not None else None
+
+    parsed["effects"] = matrix
+    parsed["effect_mask"] = mask
+    parsed["effects_valid"] = int(mask.sum()) if mask is not None else matrix.size
+    parsed["effects_skipped"] = matrix.size - parsed["effects_valid"]
+    parsed["snps"] = [
+        snp + (effect_hash,)
+        for snp, effect_hash in zip(parsed["snps"], fingerprint_rows(parsed["snps"], matrix, mask))
+    ]
+
+    return parsed
+
+
+def fingerprint_rows(snps: List[tuple], matrix: np.ndarray, mask: Optional[np.ndarray]) -> List[int]:
+    """
+    计算每行的指纹：rs_id、max_abs_sad 与效应值向量（含有效性掩码）的 64 位 BLAKE2b 哈希
+
+    指纹保存在 snps.effect_hash 中，增量导入时据此判断行是否发生变化。
+    效应值按 target_columns 的顺序参与哈希，因此靶点集合变化时所有行都会被视为已变化。
+    掩码只在该行确有无效单元格时参与哈希，指纹不受同一数据块中其他行的影响。
+    """
+    hashes = []
+    for idx, snp in enumerate(snps):
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{snp[3] or ''}\t{snp[6]!r}\t".encode('utf-8'))
+        digest.update(matrix[idx].tobytes())
+        if mask is not None and not mask[idx].all():
+            digest.update(mask[idx].tobytes())
+        hashes.append(int.from_bytes(digest.digest(), 'big', signed=True))
+    return hashes
+
+
+def parse_effect_block(cells: List[str], n_rows: int, n_cols: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    将扁平的效应值字符串列表一次性解析为 float32 矩阵
 
-    logger.info(f"Read {len(data_rows)} data rows from TSV file")
-    return data_rows
+    快速路径对整块调用一次 map(float)；只有当块中存在空值或非法值时，
+    才退回逐单元格解析（空值 -> 0.0，非法值 -> NaN 且 mask 为 False）。
+
+    Returns:
+        (matrix, mask)，mask 为 None 表示全部单元格有效
+    """
+    try:
+        values = np.fromiter(map(float, cells), dtype=np.float32, count=len(cells))
+        return values.reshape(n_rows, n_cols), None
+    except ValueError:
+        pass
+
+    values = np.empty(len(cells), dtype=np.float32)
+    mask = np.ones(len(cells), dtype=bool)
+    for idx, cell in enumerate(cells):
+        if not cell:
+            values[idx] = 0.0
+            continue
+        try:
+            values[idx] = float(cell)
+        except ValueError:
+            values[idx] = np.nan
+            mask[idx] = False
+    return values.reshape(n_rows, n_cols), mask.reshape(n_rows, n_cols)
+
+
+def validate_chunk(parsed: dict, effect_abs_limit: float = EFFECT_ABS_LIMIT) -> dict:
+    """
+    向量化校验一个已解析的数据块
+
+    - max_abs_sad 与该行效应值绝对值最大值不一致
+    - 块内重复的SNP (chrom, pos, ref_allele, alt_allele)
+    - 非有限值或绝对值超过 effect_abs_limit 的效应值
+
+    只报告问题，不修改数据。
+
+    Returns:
+        {"max_abs_sad_mismatches", "duplicate_snps", "out_of_range_effects"}
+    """
+    matrix = parsed["effects"]
+    valid = parsed["effect_mask"] if parsed["effect_mask"] is not None else np.ones(matrix.shape, dtype=bool)
+    snps = parsed["snps"]
+    row_nums = np.array([snp[0] for snp in snps], dtype=np.int64)
+
+    finite = valid & np.isfinite(matrix)
+    out_of_range = valid & ~(finite & (np.abs(matrix) <= effect_abs_limit))
+
+    if matrix.shape[1]:
+        row_max = np.where(finite, np.abs(matrix), 0.0).max(axis=1)
+    else:
+        row_max = np.zeros(len(snps), dtype=np.float32)
+    max_abs_sad = np.array([snp[6] for snp in snps], dtype=np.float64)
+    mismatched = ~np.isclose(row_max, max_abs_sad, rtol=1e-5, atol=1e-6)
+
+    keys = [snp_key(snp) for snp in snps]
+    duplicate_snps = len(keys) - len(set(keys))
+
+    report = {
+        "max_abs_sad_mismatches": int(mismatched.sum()),
+        "duplicate_snps": duplicate_snps,
+        "out_of_range_effects": int(out_of_range.sum())
+    }
+
+    if report["max_abs_sad_mismatches"]:
+        logger.warning(
+            f"Rows {parsed['start_row']}-{parsed['end_row']}: {report['max_abs_sad_mismatches']} rows where "
+            f"max_abs_sad differs from max |effect| (e.g. rows {row_nums[mismatched][:5].tolist()})"
+        )
+    if report["duplicate_snps"]:
+        logger.warning(
+            f"Rows {parsed['start_row']}-{parsed['end_row']}: {duplicate_snps} duplicate SNPs in chunk"
+        )
+    if report["out_of_range_effects"]:
+        logger.warning(
+            f"Rows {parsed['start_row']}-{parsed['end_row']}: {report['out_of_range_effects']} effect values "
+            f"non-finite or beyond +/-{effect_abs_limit} "
+            f"(e.g. rows {row_nums[out_of_range.any(axis=1)][:5].tolist()})"
+        )
+
+    return report
+
+
+def snp_key(snp: tuple) -> tuple:
+    """已解析SNP行的唯一键 (chrom, pos, ref_allele, alt_allele)"""
+    return snp[1], snp[2], snp[4], snp[5]
+
+
+def iter_effect_rows(parsed: dict) -> Iterator[list]:
+    """按行产出效应值列表，无效单元格为 None"""
+    mask = parsed["effect_mask"]
+    for idx, values in enumerate(parsed["effects"].tolist()):
+        if mask is not None:
+            values = [v if ok else None for v, ok in zip(values, mask[idx])]
+        yield values
 
 
 # ============================================
@@ -162,104 +498,1236 @@ def import_targets(session, effect_columns: List[str]) -> dict:
     return target_name_to_id
 
 
+def get_target_index_version(cursor, target_ids: List[int]) -> int:
+    """
+    获取（必要时创建）与 target_ids 顺序一致的靶点索引版本
+
+    版本一经创建不再修改，打包的效应值向量按其 target_ids 顺序存放。
+    """
+    cursor.execute("""
+        INSERT INTO target_index_versions (target_ids) VALUES (%s)
+        ON CONFLICT (target_ids) DO NOTHING
+    """, (target_ids,))
+    cursor.execute("SELECT version FROM target_index_versions WHERE target_ids = %s", (target_ids,))
+    return cursor.fetchone()[0]
+
+
+def write_chunk_rows(cursor, parsed: dict, target_ids: List[int],
+                     storage: str = "rows", vector_version: int = None, partitioned: bool = False) -> int:
+    """
+    逐行 upsert 一个已解析的数据块（row 模式）
+
+    Args:
+        storage: "rows" 写 snp_effects，"vectors" 写 snp_effect_vectors，"both" 两者都写
+        vector_version: target_ids 对应的 target_index_versions 版本（写向量时必需）
+        partitioned: snp_effects 按 chrom 分区（见 effects_partitioned），写入时带上 chrom
+
+    Returns:
+        成功写入的SNP数
+    """
+    written = 0
+    for snp_row, effects in zip(parsed["snps"], iter_effect_rows(parsed)):
+        # Insert SNP (or get existing ID)
+        cursor.execute("""
+            INSERT INTO snps (chrom, pos, rs_id, ref_allele, alt_allele, max_abs_sad, effect_hash)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (chrom, pos, ref_allele, alt_allele)
+            DO UPDATE SET rs_id = EXCLUDED.rs_id, max_abs_sad = EXCLUDED.max_abs_sad,
+                          effect_hash = EXCLUDED.effect_hash
+            RETURNING id
+        """, snp_row[1:])
+        snp_id = cursor.fetchone()[0]
+
+        # Insert effect values
+        if storage != "vectors" and partitioned:
+            for target_id, effect_value in zip(target_ids, effects):
+                if effect_value is None:
+                    continue
+                cursor.execute("""
+                    INSERT INTO snp_effects (snp_id, target_id, chrom, effect_value)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (chrom, snp_id, target_id)
+                    DO UPDATE SET effect_value = EXCLUDED.effect_value
+                """, (snp_id, target_id, snp_row[1], effect_value))
+        elif storage != "vectors":
+            for target_id, effect_value in zip(target_ids, effects):
+                if effect_value is None:
+                    continue
+                cursor.execute("""
+                    INSERT INTO snp_effects (snp_id, target_id, effect_value)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (snp_id, target_id)
+                    DO UPDATE SET effect_value = EXCLUDED.effect_value
+                """, (snp_id, target_id, effect_value))
+
+        if storage != "rows":
+            cursor.execute("""
+                INSERT INTO snp_effect_vectors (snp_id, target_index_version, effect_values)
+                VALUES (%s, %s, %s::real[])
+                ON CONFLICT (snp_id)
+                DO UPDATE SET target_index_version = EXCLUDED.target_index_version,
+                              effect_values = EXCLUDED.effect_values
+            """, (snp_id, vector_version, effects))
+
+        written += 1
+    return written
+
+
+# ============================================
+# COPY-based Bulk Loader
+# ============================================
+def create_staging_table(cursor, table_name: str = STAGING_SNPS_TABLE):
+    """
+    （重新）创建 UNLOGGED 暂存表
+
+    每行保存一个SNP及其按靶点顺序排列的效应值数组，无法解析的效应值为 NULL。
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+    cursor.execute(f"""
+        CREATE UNLOGGED TABLE {table_name} (
+            row_num BIGINT NOT NULL,
+            chrom VARCHAR(10) NOT NULL,
+            pos BIGINT NOT NULL,
+            rs_id VARCHAR(100),
+            ref_allele VARCHAR(10) NOT NULL,
+            alt_allele VARCHAR(10) NOT NULL,
+            max_abs_sad FLOAT NOT NULL,
+            effect_hash BIGINT,
+            effects FLOAT8[] NOT NULL
+        )
+    """)
+
+
+def merge_staging_table(cursor, target_ids: List[int], table_name: str = STAGING_SNPS_TABLE,
+                        storage: str = "rows", vector_version: int = None, partitioned: bool = False):
+    """
+    以集合方式将暂存表合并到 snps / snp_effects / snp_effect_vectors
+
+    与逐行模式的冲突语义一致：同一批次内重复的SNP以最后出现的行为准，
+    已存在的SNP更新 rs_id / max_abs_sad，已存在的效应值更新 effect_value。
+    storage / vector_version / partitioned 含义同 write_chunk_rows。
+    """
+    cursor.execute(f"""
+        INSERT INTO snps (chrom, pos, rs_id, ref_allele, alt_allele, max_abs_sad, effect_hash)
+        SELECT DISTINCT ON (chrom, pos, ref_allele, alt_allele)
+               chrom, pos, rs_id, ref_allele, alt_allele, max_abs_sad, effect_hash
+        FROM {table_name}
+        ORDER BY chrom, pos, ref_allele, alt_allele, row_num DESC
+        ON CONFLICT (chrom, pos, ref_allele, alt_allele)
+        DO UPDATE SET rs_id = EXCLUDED.rs_id, max_abs_sad = EXCLUDED.max_abs_sad,
+                      effect_hash = EXCLUDED.effect_hash
+    """)
+
+    if storage != "rows":
+        cursor.execute(f"""
+            INSERT INTO snp_effect_vectors (snp_id, target_index_version, effect_values)
+            SELECT DISTINCT ON (s.id) s.id, %s, st.effects::real[]
+            FROM {table_name} st
+            JOIN snps s
+              ON s.chrom = st.chrom AND s.pos = st.pos
+             AND s.ref_allele = st.ref_allele AND s.alt_allele = st.alt_allele
+            ORDER BY s.id, st.row_num DESC
+            ON CONFLICT (snp_id)
+            DO UPDATE SET target_index_version = EXCLUDED.target_index_version,
+                          effect_values = EXCLUDED.effect_values
+        """, (vector_version,))
+
+    if storage == "vectors":
+        return
+
+    # Partitioned snp_effects carries chrom, and its unique key includes it
+    chrom_column, chrom_value = (", chrom", ", s.chrom") if partitioned else ("", "")
+    cursor.execute(f"""
+        INSERT INTO snp_effects (snp_id, target_id{chrom_column}, effect_value)
+        SELECT DISTINCT ON (s.id, t.target_id) s.id, t.target_id{chrom_value}, e.effect_value
+        FROM {table_name} st
+        JOIN snps s
+          ON s.chrom = st.chrom AND s.pos = st.pos
+         AND s.ref_allele = st.ref_allele AND s.alt_allele = st.alt_allele
+        CROSS JOIN LATERAL unnest(st.effects) WITH ORDINALITY AS e(effect_value, idx)
+        CROSS JOIN LATERAL (SELECT (%s::int[])[e.idx] AS target_id) t
+        WHERE e.effect_value IS NOT NULL
+        ORDER BY s.id, t.target_id, st.row_num DESC
+        ON CONFLICT ({"chrom, " if partitioned else ""}snp_id, target_id)
+        DO UPDATE SET effect_value = EXCLUDED.effect_value
+    """, (target_ids,))
+
+
+def write_chunk_copy(
+    cursor,
+    parsed: dict,
+    target_ids: List[int],
+    staging_table: str = STAGING_SNPS_TABLE,
+    storage: str = "rows",
+    vector_version: int = None,
+    partitioned: bool = False
+) -> int:
+    """
+    通过 COPY + 集合式 upsert 写入一个已解析的数据块（copy 模式）
+
+    往返次数从 每行 (1 + 靶点数) 次降为 每块常数次。
+
+    Returns:
+        成功写入的SNP数
+    """
+    buffer = io.StringIO()
+    for snp_row, effects in zip(parsed["snps"], iter_effect_rows(parsed)):
+        buffer.write('\t'.join(copy_field(v) for v in snp_row))
+        buffer.write('\t{' + ','.join(
+            'NULL' if v is None else repr(v) for v in effects
+        ) + '}\n')
+    buffer.seek(0)
+
+    cursor.execute(f"TRUNCATE {staging_table}")
+    cursor.copy_expert(
+        f"COPY {staging_table} "
+        f"(row_num, chrom, pos, rs_id, ref_allele, alt_allele, max_abs_sad, effect_hash, effects) "
+        f"FROM STDIN",
+        buffer
+    )
+    merge_staging_table(
+        cursor, target_ids, staging_table,
+        storage=storage, vector_version=vector_version, partitioned=partitioned
+    )
+    return len(parsed["snps"])
+
+
+# ============================================
+# Partitioned snp_effects
+# ============================================
+def effect_partition_name(chrom: str) -> Optional[str]:
+    """染色体对应的分区表名；不单独分区的染色体（scaffold 等）返回 None"""
+    if not PARTITIONED_CHROM_PATTERN.match(chrom):
+        return None
+    return f"snp_effects_chr_{chrom.lower()}"
+
+
+def ensure_effect_partitions(cursor, chroms, known: set = None, unlogged: bool = False) -> List[str]:
+    """
+    为尚无分区的染色体创建 snp_effects 分区（不提交）
+
+    Args:
+        known: 已确认存在的分区名缓存，跳过重复检查；新建的分区会加入其中
+        unlogged: 创建 UNLOGGED 分区（--bulk-load 期间；finish_bulk_load 会将其切回 LOGGED）
+
+    Returns:
+        新建的分区名
+    """
+    known = known if known is not None else set()
+    created = []
+    for chrom in sorted(set(chroms)):
+        name = effect_partition_name(chrom)
+        if name is None or name in known:
+            continue
+        cursor.execute("SELECT to_regclass(%s)", (name,))
+        if cursor.fetchone()[0] is None:
+            persistence = "UNLOGGED " if unlogged else ""
+            cursor.execute(
+                f"CREATE {persistence}TABLE {name} PARTITION OF snp_effects FOR VALUES IN (%s)", (chrom,)
+            )
+            created.append(name)
+        known.add(name)
+    return created
+
+
+# ============================================
+# Effect Summary Maintenance
+# ============================================
+# Per-SNP statistics over the SNP's packed vector if it has one, else over its snp_effects rows.
+# {touched} is a query yielding (id, chrom) of the SNPs to recompute.
+EFFECT_SUMMARY_SQL = """
+    WITH touched AS ({touched})
+    INSERT INTO snp_effect_summary
+        (snp_id, total_targets, mean_effect, std_effect, min_effect, max_effect, updated_at)
+    SELECT t.id, COUNT(x.v), AVG(x.v), STDDEV(x.v), MIN(x.v), MAX(x.v), CURRENT_TIMESTAMP
+    FROM touched t
+    LEFT JOIN snp_effect_vectors ev ON ev.snp_id = t.id
+    LEFT JOIN LATERAL (
+        SELECT unnest(ev.effect_values)::float8 AS v WHERE ev.snp_id IS NOT NULL
+        UNION ALL
+        SELECT e.effect_value FROM snp_effects e
+        WHERE ev.snp_id IS NULL AND e.snp_id = t.id {partition_filter}
+    ) x ON true
+    GROUP BY t.id
+    ON CONFLICT (snp_id) DO UPDATE
+    SET total_targets = EXCLUDED.total_targets, mean_effect = EXCLUDED.mean_effect,
+        std_effect = EXCLUDED.std_effect, min_effect = EXCLUDED.min_effect,
+        max_effect = EXCLUDED.max_effect, updated_at = EXCLUDED.updated_at
+"""
+
+
+def _effect_summary_sql(touched: str, partitioned: bool) -> str:
+    return EFFECT_SUMMARY_SQL.format(
+        touched=touched,
+        partition_filter="AND e.chrom = t.chrom" if partitioned else ""
+    )
+
+
+def update_effect_summary(cursor, snps: List[tuple], partitioned: bool = False) -> int:
+    """
+    重新计算本块涉及的SNP的 snp_effect_summary 行（不提交）
+
+    在写入数据块的同一事务中调用，汇总表与效应值始终一致，不再需要整表刷新。
+
+    Returns:
+        更新的汇总行数
+    """
+    if not snps:
+        return 0
+
+    cursor.execute(_effect_summary_sql("""
+        SELECT DISTINCT s.id, s.chrom
+        FROM unnest(%s::varchar[], %s::bigint[], %s::varchar[], %s::varchar[])
+             AS k(chrom, pos, ref_allele, alt_allele)
+        JOIN snps s
+          ON s.chrom = k.chrom AND s.pos = k.pos
+         AND s.ref_allele = k.ref_allele AND s.alt_allele = k.alt_allele
+    """, partitioned), (
+        [snp[1] for snp in snps],
+        [snp[2] for snp in snps],
+        [snp[4] for snp in snps],
+        [snp[5] for snp in snps]
+    ))
+    return cursor.rowcount
+
+
+def rebuild_effect_summary(session) -> int:
+    """
+    从头重建 snp_effect_summary（一次性迁移或修复用；正常导入按块增量维护）
+
+    Returns:
+        汇总行数
+    """
+    logger.info("Rebuilding snp_effect_summary...")
+    connection = session.connection().connection
+    cursor = connection.cursor()
+    try:
+        partitioned = effects_partitioned(cursor)
+        cursor.execute("TRUNCATE snp_effect_summary")
+        cursor.execute(_effect_summary_sql("SELECT id, chrom FROM snps", partitioned))
+        rows = cursor.rowcount
+        cursor.execute("ANALYZE snp_effect_summary")
+        connection.commit()
+        logger.info(f"snp_effect_summary rebuilt: {rows} SNPs")
+        return rows
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# Effect values per target. SNPs with a packed vector are counted from it, like the summary above,
+# so `--storage both` does not count them twice.
+TARGET_EFFECT_COUNTS_SQL = """
+    INSERT INTO target_effect_counts (target_id, effect_count, updated_at)
+    SELECT c.target_id, SUM(c.n), CURRENT_TIMESTAMP
+    FROM (
+        SELECT e.target_id, COUNT(*) AS n
+        FROM snp_effects e
+        WHERE NOT EXISTS (SELECT 1 FROM snp_effect_vectors v WHERE v.snp_id = e.snp_id)
+        GROUP BY e.target_id
+        UNION ALL
+        SELECT ti.target_ids[x.i], COUNT(*)
+        FROM snp_effect_vectors v
+        JOIN target_index_versions ti ON ti.version = v.target_index_version
+        CROSS JOIN LATERAL unnest(v.effect_values) WITH ORDINALITY AS x(value, i)
+        WHERE x.value IS NOT NULL
+        GROUP BY 1
+    ) c
+    JOIN targets t ON t.id = c.target_id
+    GROUP BY c.target_id
+"""
+
+
+def refresh_target_effect_counts(session) -> int:
+    """
+    重算 target_effect_counts（不提交）
+
+    每次导入结束时与数据集版本号在同一事务中更新，API 据此选取列表预览的常见靶点，
+    不必在每次请求时对 snp_effects 做全表 GROUP BY。用 DELETE 而不是 TRUNCATE，
+    重算期间 API 仍能读到旧的排名。
+
+    Returns:
+        有效应值的靶点数
+    """
+    session.execute(text("DELETE FROM target_effect_counts"))
+    return session.execute(text(TARGET_EFFECT_COUNTS_SQL)).rowcount
+
+
+# ============================================
+# Delta Import
+# ============================================
+def classify_chunk(cursor, parsed: dict) -> dict:
+    """
+    按 snps.effect_hash 指纹将数据块中的SNP分为新增 / 变化 / 未变化
+
+    整块只发一次查询：用 unnest 展开本块的SNP键并与 snps 连接。
+
+    Returns:
+        {"inserted": [idx, ...], "updated": [idx, ...], "unchanged": [idx, ...]}，idx 为 parsed["snps"] 下标
+    """
+    snps = parsed["snps"]
+    classes = {"inserted": [], "updated": [], "unchanged": []}
+    if not snps:
+        return classes
+
+    cursor.execute("""
+        SELECT k.idx, s.effect_hash
+        FROM unnest(%s::varchar[], %s::bigint[], %s::varchar[], %s::varchar[])
+             WITH ORDINALITY AS k(chrom, pos, ref_allele, alt_allele, idx)
+        JOIN snps s
+          ON s.chrom = k.chrom AND s.pos = k.pos
+         AND s.ref_allele = k.ref_allele AND s.alt_allele = k.alt_allele
+    """, (
+        [snp[1] for snp in snps],
+        [snp[2] for snp in snps],
+        [snp[4] for snp in snps],
+        [snp[5] for snp in snps]
+    ))
+    existing = {idx - 1: effect_hash for idx, effect_hash in cursor.fetchall()}
+
+    for idx, snp in enumerate(snps):
+        if idx not in existing:
+            classes["inserted"].append(idx)
+        elif existing[idx] != snp[7]:
+            classes["updated"].append(idx)
+        else:
+            classes["unchanged"].append(idx)
+    return classes
+
+
+def subset_parsed(parsed: dict, indices: List[int]) -> dict:
+    """取已解析数据块中指定下标的SNP，返回新的 parsed 字典"""
+    rows = np.asarray(indices, dtype=np.intp)
+    subset = dict(parsed)
+    subset["snps"] = [parsed["snps"][idx] for idx in indices]
+    subset["effects"] = parsed["effects"][rows]
+    subset["effect_mask"] = parsed["effect_mask"][rows] if parsed["effect_mask"] is not None else None
+    subset["effects_valid"] = (
+        int(subset["effect_mask"].sum()) if subset["effect_mask"] is not None else subset["effects"].size
+    )
+    return subset
+
+
+def delete_stale_effects(cursor, parsed: dict, target_ids: List[int], partitioned: bool = False) -> int:
+    """
+    删除数据块中已存在SNP的、在新行里已无有效值的 snp_effects 记录（不提交）
+
+    delta 导入只 upsert 新行中的有效效应值；旧行有而新行缺失（单元格无效或该靶点列已不在文件中）
+    的 (snp_id, target_id) 必须先删掉，否则会残留旧效应值，汇总表也会按旧值计算。
+
+    Returns:
+        删除的效应值记录数
+    """
+    snps = parsed["snps"]
+    if not snps:
+        return 0
+    partition_filter = "AND e.chrom = s.chrom" if partitioned else ""
+
+    # Targets that are not columns of this file at all
+    cursor.execute(f"""
+        DELETE FROM snp_effects e
+        USING unnest(%s::varchar[], %s::bigint[], %s::varchar[], %s::varchar[])
+              AS k(chrom, pos, ref_allele, alt_allele)
+        JOIN snps s
+          ON s.chrom = k.chrom AND s.pos = k.pos
+         AND s.ref_allele = k.ref_allele AND s.alt_allele = k.alt_allele
+        WHERE e.snp_id = s.id {partition_filter}
+          AND NOT (e.target_id = ANY(%s::int[]))
+    """, (
+        [snp[1] for snp in snps],
+        [snp[2] for snp in snps],
+        [snp[4] for snp in snps],
+        [snp[5] for snp in snps],
+        target_ids
+    ))
+    deleted = cursor.rowcount
+
+    # Cells that are invalid in the new row
+    if parsed["effect_mask"] is not None:
+        rows, columns = np.nonzero(~parsed["effect_mask"])
+        if len(rows):
+            cursor.execute(f"""
+                DELETE FROM snp_effects e
+                USING unnest(%s::varchar[], %s::bigint[], %s::varchar[], %s::varchar[], %s::int[])
+                      AS k(chrom, pos, ref_allele, alt_allele, target_id)
+                JOIN snps s
+                  ON s.chrom = k.chrom AND s.pos = k.pos
+                 AND s.ref_allele = k.ref_allele AND s.alt_allele = k.alt_allele
+                WHERE e.snp_id = s.id AND e.target_id = k.target_id {partition_filter}
+            """, (
+                [snps[row][1] for row in rows],
+                [snps[row][2] for row in rows],
+                [snps[row][4] for row in rows],
+                [snps[row][5] for row in rows],
+                [target_ids[column] for column in columns]
+            ))
+            deleted += cursor.rowcount
+    return deleted
+
+
+def create_seen_keys_table(cursor, table_name: str = SEEN_KEYS_TABLE):
+    """（重新）创建记录本次输入中出现过的SNP键的 UNLOGGED 表"""
+    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+    cursor.execute(f"""
+        CREATE UNLOGGED TABLE {table_name} (
+            chrom VARCHAR(10) NOT NULL,
+            pos BIGINT NOT NULL,
+            ref_allele VARCHAR(10) NOT NULL,
+            alt_allele VARCHAR(10) NOT NULL
+        )
+    """)
+
+
+def record_seen_keys(cursor, parsed: dict, table_name: str = SEEN_KEYS_TABLE):
+    """将数据块中的SNP键 COPY 进 seen 表（与数据块同一事务）"""
+    buffer = io.StringIO()
+    for snp in parsed["snps"]:
+        buffer.write('\t'.join(copy_field(v) for v in snp_key(snp)) + '\n')
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table_name} (chrom, pos, ref_allele, alt_allele) FROM STDIN",
+        buffer
+    )
+
+
+def delete_missing_snps(session, table_name: str = SEEN_KEYS_TABLE) -> int:
+    """
+    删除本次输入中未出现的SNP（效应值随外键级联删除），然后删除 seen 表
+
+    Returns:
+        删除的SNP数
+    """
+    connection = session.connection().connection
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"ANALYZE {table_name}")
+        cursor.execute(f"""
+            DELETE FROM snps s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {table_name} k
+                WHERE k.chrom = s.chrom AND k.pos = s.pos
+                  AND k.ref_allele = s.ref_allele AND k.alt_allele = s.alt_allele
+            )
+        """)
+        deleted = cursor.rowcount
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+        connection.commit()
+        return deleted
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# ============================================
+# Import Driver
+# ============================================
+def new_import_stats() -> dict:
+    """创建空的导入统计"""
+    return {
+        "snps_imported": 0,
+        "snps_skipped": 0,
+        "effects_imported": 0,
+        "effects_skipped": 0,
+        "max_abs_sad_mismatches": 0,
+        "duplicate_snps": 0,
+        "out_of_range_effects": 0,
+        "chunks_resumed": 0,
+        "rows_quarantined": 0,
+        "snps_inserted": 0,
+        "snps_updated": 0,
+        "snps_unchanged": 0,
+        "snps_deleted": 0,
+        "effects_deleted": 0,
+        "errors": []
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB），不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
 def import_snps_and_effects(
     session,
-    data_rows: List[dict],
+    file_path: str,
     target_name_to_id: dict,
-    batch_size: int = BATCH_SIZE
+    mode: str = "row",
+    chunk_size: int = BATCH_SIZE,
+    max_memory_mb: int = MAX_MEMORY_MB,
+    shard: dict = None,
+    effect_abs_limit: float = EFFECT_ABS_LIMIT,
+    import_log_id: int = None,
+    source_hash: str = None,
+    resume: bool = False,
+    max_retries: int = MAX_RETRIES,
+    reject_file: str = None,
+    delta: bool = False,
+    delete_missing: bool = False,
+    storage: str = "rows",
+    bulk_load: bool = False
 ) -> dict:
     """
-    导入SNP和效应值数据
+    流式导入SNP和效应值数据
+
+    读取、解析校验、写入三个阶段以生成器串联，每次只有一个数据块驻留内存；
+    每个数据块在一个事务中写入并提交，同一事务内记录该块的检查点。
+    写入失败的数据块按退避重试，仍失败则整块隔离到 reject 文件。
 
     Args:
         session: SQLAlchemy session
-        data_rows: List of data rows from TSV
+        file_path: Path to TSV file
         target_name_to_id: Mapping of target names to IDs
-        batch_size: Batch size for bulk insert
+        mode: "row" (per-row upserts) or "copy" (COPY into staging + set-based merge)
+        chunk_size: Maximum number of rows per chunk
+        max_memory_mb: Approximate memory ceiling for one in-flight chunk
+        shard: Optional shard from compute_shards(); only that byte range is imported
+        effect_abs_limit: Effect values beyond +/- this are reported as out of range
+        import_log_id: data_import_log id that checkpoints are recorded under (None disables checkpoints)
+        source_hash: SHA-256 of the source file, see compute_file_hash()
+        resume: Skip chunks already checkpointed for source_hash
+        max_retries: Retries for a chunk whose write fails before it is quarantined
+        reject_file: Where quarantined rows are written (default: <file>.rejects.tsv)
+        delta: Only write SNPs that are new or whose fingerprint changed
+        delete_missing: Record the keys of every SNP in the input into SEEN_KEYS_TABLE,
+            which must already exist (see create_seen_keys_table / delete_missing_snps)
+        storage: "rows" (snp_effects), "vectors" (snp_effect_vectors) or "both"
+        bulk_load: prepare_bulk_load() has run; partitions created during the import are UNLOGGED too
 
     Returns:
         Dictionary with import statistics
     """
-    from backend.main import SNPModel, SNPEffectModel
+    shard = shard or {}
+    log_prefix = f"[shard {shard['index']}] " if shard else ""
+    staging_table = f"{STAGING_SNPS_TABLE}_{shard['index']}" if shard else STAGING_SNPS_TABLE
+    reject_file = reject_file or f"{file_path}.rejects.tsv"
+    if shard:
+        reject_file = f"{reject_file}.shard{shard['index']}"
+    quarantine = RejectWriter(reject_file, file_path, append=resume)
+
+    logger.info(
+        f"{log_prefix}Importing SNPs and effects (mode={mode}, chunk_size={chunk_size}, "
+        f"max_memory_mb={max_memory_mb})..."
+    )
 
-    logger.info(f"Importing SNPs and effects (batch_size={batch_size})...")
+    stats = new_import_stats()
 
-    stats = {
-        "snps_imported": 0,
-        "snps_skipped": 0,
-        "effects_imported": 0,
-        "effects_skipped": 0,
-        "errors": []
-    }
+    snp_columns, effect_columns = parse_tsv_header(file_path)
+    columns = build_column_index(snp_columns + effect_columns)
+    target_columns = resolve_target_columns(effect_columns, target_name_to_id)
+    target_ids = [target_id for _, target_id in target_columns]
+
+    # Raw text is expanded several times once split into Python objects
+    max_chunk_bytes = max_memory_mb * 1024 * 1024 // CHUNK_MEMORY_EXPANSION
 
     # Use raw connection for faster bulk inserts
     connection = session.connection().connection
     cursor = connection.cursor()
 
-    for row_idx, row in enumerate(tqdm(data_rows, desc="Importing rows"), start=1):
-        try:
-            # Extract SNP basic info
-            chrom = row.get('chrom', '')
-            pos = int(row.get('pos', 0)) if row.get('pos', '').isdigit() else 0
-            rs_id = row.get('id', '')
-            ref_allele = row.get('ref', '')
-            alt_allele = row.get('alt', '')
-            max_abs_sad = float(row.get('max_abs_sad', 0))
-
-            # Validate required fields
-            if not all([chrom, pos, ref_allele, alt_allele]):
-                logger.warning(f"Row {row_idx}: Missing required SNP fields, skipping")
-                stats["snps_skipped"] += 1
+    partitioned = effects_partitioned(cursor)
+    known_partitions = set()
+
+    vector_version = None
+    if storage != "rows":
+        vector_version = get_target_index_version(cursor, target_ids)
+        connection.commit()
+        logger.info(f"{log_prefix}Packing effect vectors with target index version {vector_version}")
+
+    if mode == "copy":
+        write_chunk = functools.partial(
+            write_chunk_copy, staging_table=staging_table,
+            storage=storage, vector_version=vector_version, partitioned=partitioned
+        )
+    else:
+        write_chunk = functools.partial(
+            write_chunk_rows, storage=storage, vector_version=vector_version, partitioned=partitioned
+        )
+    if mode == "copy":
+        create_staging_table(cursor, staging_table)
+        connection.commit()
+
+    completed_ranges = []
+    if resume and source_hash:
+        completed_ranges = load_completed_ranges(cursor, source_hash)
+        connection.commit()
+        logger.info(f"{log_prefix}Resuming: {len(completed_ranges)} completed byte ranges found")
+
+    chunks = iter_tsv_chunks(
+        file_path,
+        chunk_size,
+        max_chunk_bytes,
+        start_offset=shard.get("start_offset"),
+        end_offset=shard.get("end_offset"),
+        first_row=shard.get("first_row", 1)
+    )
+
+    total_bytes = (
+        shard["end_offset"] - shard["start_offset"] if shard else os.path.getsize(file_path)
+    )
+    # Workers log per chunk instead of drawing interleaved progress bars
+    with tqdm(total=total_bytes, desc="Importing", unit="B", unit_scale=True,
+              disable=bool(shard)) as progress:
+        for chunk_num, chunk in enumerate(chunks, start=1):
+            if is_range_completed(completed_ranges, chunk["start_offset"], chunk["end_offset"]):
+                stats["chunks_resumed"] += 1
+                progress.update(chunk["end_offset"] - chunk["start_offset"])
                 continue
 
-            # Insert SNP (or get existing ID)
-            cursor.execute("""
-                INSERT INTO snps (chrom, pos, rs_id, ref_allele, alt_allele, max_abs_sad)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (chrom, pos, ref_allele, alt_allele)
-                DO UPDATE SET rs_id = EXCLUDED.rs_id, max_abs_sad = EXCLUDED.max_abs_sad
-                RETURNING id
-            """, (chrom, pos, rs_id if rs_id else None, ref_allele, alt_allele, max_abs_sad))
-
-            snp_id = cursor.fetchone()[0]
-            stats["snps_imported"] += 1
-
-            # Insert effect values
-            for target_name, target_id in target_name_to_id.items():
-                effect_value_str = row.get(target_name, '0')
+            parsed = parse_chunk(chunk, columns, target_columns)
+            stats["snps_skipped"] += parsed["snps_skipped"]
+            stats["effects_skipped"] += parsed["effects_skipped"]
+            stats["errors"].extend(parsed["errors"])
+            merge_stats(stats, validate_chunk(parsed, effect_abs_limit))
+            stats["rows_quarantined"] += quarantine.write_rows(parsed["rejected_rows"])
+
+            for attempt in range(max_retries + 1):
                 try:
-                    effect_value = float(effect_value_str) if effect_value_str else 0.0
+                    # New partitions are committed on their own, before this chunk takes row locks
+                    if partitioned and storage != "vectors":
+                        created = ensure_effect_partitions(
+                            cursor, (snp[1] for snp in parsed["snps"]), known_partitions, unlogged=bulk_load
+                        )
+                        connection.commit()
+                        if created:
+                            logger.info(f"{log_prefix}Created partitions: {', '.join(created)}")
+
+                    to_write = parsed
+                    effects_deleted = 0
+                    if delta:
+                        classes = classify_chunk(cursor, parsed)
+                        to_write = subset_parsed(parsed, sorted(classes["inserted"] + classes["updated"]))
+                        if storage != "vectors" and classes["updated"]:
+                            effects_deleted = delete_stale_effects(
+                                cursor, subset_parsed(parsed, classes["updated"]), target_ids, partitioned
+                            )
+                    if delete_missing:
+                        record_seen_keys(cursor, parsed)
+                    written = write_chunk(cursor, to_write, target_ids)
+                    update_effect_summary(cursor, to_write["snps"], partitioned)
+                    record_checkpoint(cursor, import_log_id, source_hash, parsed, written, "committed")
+                    connection.commit()
+                    stats["snps_imported"] += written
+                    stats["effects_imported"] += to_write["effects_valid"]
+                    if delta:
+                        stats["snps_inserted"] += len(classes["inserted"])
+                        stats["snps_updated"] += len(classes["updated"])
+                        stats["snps_unchanged"] += len(classes["unchanged"])
+                        stats["effects_deleted"] += effects_deleted
+                    break
+                except Exception as e:
+                    connection.rollback()
+                    if attempt < max_retries:
+                        delay = RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                        logger.warning(
+                            f"{log_prefix}Error writing rows {parsed['start_row']}-{parsed['end_row']} "
+                            f"(attempt {attempt + 1}/{max_retries + 1}), retrying in {delay:.1f}s: {str(e)}"
+                        )
+                        time.sleep(delay)
+                        continue
+
+                    logger.error(
+                        f"{log_prefix}Error writing rows {parsed['start_row']}-{parsed['end_row']}, "
+                        f"quarantined to {quarantine.path}: {str(e)}"
+                    )
+                    stats["errors"].append(f"Rows {parsed['start_row']}-{parsed['end_row']}: {str(e)}")
+                    stats["rows_quarantined"] += quarantine.write_chunk(parsed)
+                    try:
+                        record_checkpoint(cursor, import_log_id, source_hash, parsed, 0, "quarantined")
+                        connection.commit()
+                    except Exception as checkpoint_error:
+                        connection.rollback()
+                        logger.warning(f"{log_prefix}Failed to record quarantine checkpoint: {checkpoint_error}")
+
+            progress.update(parsed["end_offset"] - parsed["start_offset"])
+            peak_rss = _peak_rss_mb()
+            logger.info(
+                f"{log_prefix}Chunk {chunk_num}: rows {parsed['start_row']}-{parsed['end_row']}, "
+                f"total SNPs imported {stats['snps_imported']}"
+                + (f", peak RSS {peak_rss:.0f} MB" if peak_rss is not None else "")
+            )
 
-                    cursor.execute("""
-                        INSERT INTO snp_effects (snp_id, target_id, effect_value)
-                        VALUES (%s, %s, %s)
-                        ON CONFLICT (snp_id, target_id)
-                        DO UPDATE SET effect_value = EXCLUDED.effect_value
-                    """, (snp_id, target_id, effect_value))
+    quarantine.close()
+    if mode == "copy":
+        cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        connection.commit()
+    cursor.close()
 
-                    stats["effects_imported"] += 1
+    return stats
 
-                except (ValueError, TypeError) as e:
-                    logger.debug(f"Invalid effect value for SNP {snp_id}, target {target_name}: {e}")
-                    stats["effects_skipped"] += 1
 
-            # Commit periodically
-            if row_idx % batch_size == 0:
-                connection.commit()
-                logger.info(f"Processed {row_idx} rows...")
+# ============================================
+# Parallel Sharded Import
+# ============================================
+def compute_shards(file_path: str, num_shards: int) -> List[dict]:
+    """
+    按字节范围将数据行划分为若干分片，分片边界对齐到行首
 
-        except Exception as e:
-            logger.error(f"Error processing row {row_idx}: {str(e)}")
-            stats["errors"].append(f"Row {row_idx}: {str(e)}")
-            connection.rollback()
+    同时统计每个分片之前的行数，使各分片报告的行号与单进程导入一致。
 
-    # Final commit
-    connection.commit()
-    cursor.close()
+    Returns:
+        [{"index", "start_offset", "end_offset", "first_row"}, ...]
+    """
+    file_size = os.path.getsize(file_path)
+
+    with open(file_path, 'rb') as f:
+        data_start = len(f.readline())
+        shard_bytes = max(1, (file_size - data_start) // num_shards)
+
+        boundaries = [data_start]
+        for i in range(1, num_shards):
+            f.seek(max(data_start + i * shard_bytes, boundaries[-1]))
+            if f.tell() > data_start:
+                f.readline()  # advance to the next line start
+            boundary = min(f.tell(), file_size)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        if boundaries[-1] < file_size or len(boundaries) == 1:
+            boundaries.append(file_size)
+
+        shards = []
+        first_row = 1
+        for index, (start, end) in enumerate(zip(boundaries, boundaries[1:])):
+            shards.append({
+                "index": index,
+                "start_offset": start,
+                "end_offset": end,
+                "first_row": first_row
+            })
+            first_row += _count_lines(f, start, end)
+
+    return shards
+
+
+def _count_lines(f, start: int, end: int, block_size: int = 64 * 1024 * 1024) -> int:
+    """统计文件 [start, end) 字节范围内的行数"""
+    f.seek(start)
+    count = 0
+    remaining = end - start
+    while remaining > 0:
+        block = f.read(min(block_size, remaining))
+        if not block:
+            break
+        count += block.count(b'\n')
+        remaining -= len(block)
+    return count
+
+
+def _import_shard(file_path: str, target_name_to_id: dict, shard: dict, options: dict) -> dict:
+    """工作进程入口：使用独立的数据库连接导入一个分片"""
+    session, engine = get_db_connection()
+    try:
+        return import_snps_and_effects(session, file_path, target_name_to_id, shard=shard, **options)
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def merge_stats(total: dict, shard_stats: dict) -> dict:
+    """将分片/数据块统计合并到总统计中（计数累加，errors 拼接）"""
+    for key, value in shard_stats.items():
+        if key == "errors":
+            total.setdefault("errors", []).extend(value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def import_snps_and_effects_parallel(
+    file_path: str,
+    target_name_to_id: dict,
+    workers: int,
+    **options
+) -> dict:
+    """
+    使用进程池并行导入各分片
+
+    options 原样传给每个分片的 import_snps_and_effects（mode、chunk_size 等）。
+
+    靶点ID必须在调用前解析完毕并作为参数传给工作进程，工作进程不会写 targets 表。
+    分片之间没有顺序保证，若同一SNP出现在多个分片中，以最后提交的分片为准。
+
+    Returns:
+        合并后的导入统计
+    """
+    shards = compute_shards(file_path, workers)
+    logger.info(f"Importing {len(shards)} shards with {workers} workers...")
+
+    stats = new_import_stats()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_import_shard, file_path, target_name_to_id, shard, options): shard
+            for shard in shards
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Importing shards"):
+            shard = futures[future]
+            try:
+                shard_stats = future.result()
+            except Exception as e:
+                logger.error(f"Shard {shard['index']} failed: {str(e)}")
+                stats["errors"].append(
+                    f"Shard {shard['index']} (bytes {shard['start_offset']}-{shard['end_offset']}): {str(e)}"
+                )
+                continue
+            merge_stats(stats, shard_stats)
+            logger.info(f"Shard {shard['index']} done: {shard_stats['snps_imported']} SNPs imported")
+
+    return stats
+
+
+# ============================================
+# Checkpoints, Resume and Quarantine
+# ============================================
+def ensure_import_schema(session):
+    """
+    确保检查点表、效应值向量表、汇总表、靶点计数表、统计表、data_import_log 与 snps 的新增列/索引存在（兼容旧库）
+
+    旧库中的 snp_effect_summary 物化视图会被替换为增量维护的表并重建一次。
+    """
+    session.execute(text("""
+        ALTER TABLE snps ADD COLUMN IF NOT EXISTS effect_hash BIGINT
+    """))
+    session.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_snps_rs_id_pattern
+        ON snps(rs_id text_pattern_ops) WHERE rs_id IS NOT NULL
+    """))
+    session.execute(text("""
+        ALTER TABLE data_import_log ADD COLUMN IF NOT EXISTS source_hash VARCHAR(64)
+    """))
+    session.execute(text("""
+        ALTER TABLE data_import_log ALTER COLUMN status TYPE VARCHAR(30)
+    """))
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS data_import_checkpoints (
+            id BIGSERIAL PRIMARY KEY,
+            import_log_id INTEGER NOT NULL REFERENCES data_import_log(id) ON DELETE CASCADE,
+            source_hash VARCHAR(64) NOT NULL,
+            start_offset BIGINT NOT NULL,
+            end_offset BIGINT NOT NULL,
+            start_row BIGINT NOT NULL,
+            end_row BIGINT NOT NULL,
+            rows_committed INTEGER NOT NULL DEFAULT 0,
+            status VARCHAR(20) NOT NULL DEFAULT 'committed',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    session.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_import_checkpoints_hash
+        ON data_import_checkpoints(source_hash, start_offset)
+    """))
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS dataset_version (
+            id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    # snp_effect_summary used to be a materialized view refreshed as a whole
+    legacy_summary = session.execute(text("""
+        SELECT relkind = 'm' FROM pg_class WHERE oid = to_regclass('snp_effect_summary')
+    """)).scalar()
+    if legacy_summary:
+        session.execute(text("DROP MATERIALIZED VIEW snp_effect_summary"))
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS snp_effect_summary (
+            snp_id INTEGER PRIMARY KEY REFERENCES snps(id) ON DELETE CASCADE,
+            total_targets INTEGER NOT NULL DEFAULT 0,
+            mean_effect FLOAT,
+            std_effect FLOAT,
+            min_effect FLOAT,
+            max_effect FLOAT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    for column in ("mean_effect", "std_effect", "max_effect"):
+        session.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS idx_snp_effect_summary_{column.split('_')[0]}
+            ON snp_effect_summary({column})
+        """))
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS target_effect_counts (
+            target_id INTEGER PRIMARY KEY REFERENCES targets(id) ON DELETE CASCADE,
+            effect_count BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    session.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_target_effect_counts_count
+        ON target_effect_counts(effect_count DESC)
+    """))
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS dataset_statistics (
+            id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            dataset_version BIGINT NOT NULL DEFAULT 0,
+            total_snps BIGINT NOT NULL DEFAULT 0,
+            total_targets INTEGER NOT NULL DEFAULT 0,
+            total_effect_records BIGINT NOT NULL DEFAULT 0,
+            chrom_snp_counts JSONB NOT NULL DEFAULT '{}',
+            min_max_abs_sad FLOAT,
+            max_max_abs_sad FLOAT,
+            min_effect_value FLOAT,
+            max_effect_value FLOAT,
+            data_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS target_index_versions (
+            version SERIAL PRIMARY KEY,
+            target_ids INTEGER[] NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    session.execute(text("""
+        CREATE TABLE IF NOT EXISTS snp_effect_vectors (
+            snp_id INTEGER PRIMARY KEY REFERENCES snps(id) ON DELETE CASCADE,
+            target_index_version INTEGER NOT NULL REFERENCES target_index_versions(version),
+            effect_values REAL[] NOT NULL
+        )
+    """))
+    session.commit()
+
+    if legacy_summary:
+        rebuild_effect_summary(session)
+
+
+def start_import_log(session, file_path: str, source_hash: str) -> Optional[int]:
+    """
+    在导入开始时创建 status='running' 的导入日志记录
+
+    Returns:
+        data_import_log.id，失败时返回 None（此时不记录检查点）
+    """
+    try:
+        ensure_import_schema(session)
+        import_log_id = session.execute(text("""
+            INSERT INTO data_import_log (import_type, source_file, source_hash, status)
+            VALUES (:import_type, :source_file, :source_hash, 'running')
+            RETURNING id
+        """), {
+            'import_type': 'TSV_IMPORT',
+            'source_file': file_path,
+            'source_hash': source_hash
+        }).scalar()
+        session.commit()
+        return import_log_id
+    except Exception as e:
+        session.rollback()
+        logger.warning(f"Failed to start import log, checkpoints disabled: {str(e)}")
+        return None
+
+
+def bump_dataset_version(session):
+    """
+    数据集版本号加一（不提交）
+
+    每次导入结束（包括失败，已提交的数据块仍会改变数据）都会调用，
+    API 与导出的效应值矩阵等派生数据据此判断是否过期。
+    """
+    session.execute(text("""
+        INSERT INTO dataset_version (id, version, updated_at)
+        VALUES (1, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (id) DO UPDATE
+        SET version = dataset_version.version + 1, updated_at = CURRENT_TIMESTAMP
+    """))
+
+
+def refresh_dataset_statistics(session):
+    """
+    重算 dataset_statistics 单行统计（不提交），在 bump_dataset_version 之后调用
+
+    总效应值数取自 target_effect_counts，效应值范围取自 snp_effect_summary，
+    max_abs_sad 范围走 idx_snps_max_abs_sad 索引，只有按染色体计数需要扫描 snps。
+    """
+    session.execute(text("""
+        WITH chroms AS (SELECT chrom, COUNT(*) AS n FROM snps GROUP BY chrom)
+        INSERT INTO dataset_statistics (
+            id, dataset_version, total_snps, total_targets, total_effect_records, chrom_snp_counts,
+            min_max_abs_sad, max_max_abs_sad, min_effect_value, max_effect_value, data_timestamp
+        )
+        SELECT 1,
+               (SELECT COALESCE(MAX(version), 0) FROM dataset_version),
+               (SELECT COALESCE(SUM(n), 0) FROM chroms),
+               (SELECT COUNT(*) FROM targets),
+               (SELECT COALESCE(SUM(effect_count), 0) FROM target_effect_counts),
+               (SELECT COALESCE(jsonb_object_agg(chrom, n), '{}'::jsonb) FROM chroms),
+               (SELECT MIN(max_abs_sad) FROM snps),
+               (SELECT MAX(max_abs_sad) FROM snps),
+               (SELECT MIN(min_effect) FROM snp_effect_summary),
+               (SELECT MAX(max_effect) FROM snp_effect_summary),
+               CURRENT_TIMESTAMP
+        ON CONFLICT (id) DO UPDATE
+        SET dataset_version = EXCLUDED.dataset_version, total_snps = EXCLUDED.total_snps,
+            total_targets = EXCLUDED.total_targets, total_effect_records = EXCLUDED.total_effect_records,
+            chrom_snp_counts = EXCLUDED.chrom_snp_counts,
+            min_max_abs_sad = EXCLUDED.min_max_abs_sad, max_max_abs_sad = EXCLUDED.max_max_abs_sad,
+            min_effect_value = EXCLUDED.min_effect_value, max_effect_value = EXCLUDED.max_effect_value,
+            data_timestamp = EXCLUDED.data_timestamp
+    """))
+
+
+def publish_dataset_update(session):
+    """
+    数据变更后在同一事务中重算派生统计并递增数据集版本（不提交）
+
+    依次重算 target_effect_counts、递增 dataset_version、重算 dataset_statistics。
+    """
+    refresh_target_effect_counts(session)
+    bump_dataset_version(session)
+    refresh_dataset_statistics(session)
 
+
+def annotate_new_snps(database_url: str = DATABASE_URL) -> Optional[dict]:
+    """
+    导入后为新增（及注释过期）的SNP计算最近基因与区域（见 annotate_snps.py）
+
+    失败只记录警告：导入的数据已提交，可稍后单独运行 annotate_snps.py。
+    """
+    try:
+        from annotate_snps import annotate_snps
+        stats = annotate_snps(database_url)
+    except Exception as e:
+        logger.warning(f"SNP annotation failed, run annotate_snps.py later: {str(e)}")
+        return None
+    if not stats["skipped"]:
+        logger.info(f"Annotated {stats['snps_annotated']} SNPs with nearest gene and region")
     return stats
 
 
+def finish_import_log(session, import_log_id: Optional[int], stats: dict, file_path: str, status: str = None):
+    """
+    更新导入日志记录，重算派生统计并递增数据集版本；没有 import_log_id 时退回到一次性插入
+    """
+    if import_log_id is None:
+        create_import_log(session, stats, file_path)
+        try:
+            publish_dataset_update(session)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Failed to bump dataset version: {str(e)}")
+        return
+
+    try:
+        session.execute(text("""
+            UPDATE data_import_log
+            SET records_processed = :records_processed,
+                status = :status,
+                error_message = :error_message,
+                completed_at = :completed_at
+            WHERE id = :id
+        """), {
+            'id': import_log_id,
+            'records_processed': stats.get('snps_imported', 0),
+            'status': status or ('completed' if not stats.get('errors') else 'completed_with_errors'),
+            'error_message': '; '.join(stats.get('errors', []))[:1000] if stats.get('errors') else None,
+            'completed_at': datetime.utcnow()
+        })
+        publish_dataset_update(session)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.warning(f"Failed to update import log: {str(e)}")
+
+
+def record_checkpoint(cursor, import_log_id: Optional[int], source_hash: Optional[str],
+                      parsed: dict, rows_committed: int, status: str):
+    """在当前事务中记录一个数据块的检查点"""
+    if import_log_id is None or source_hash is None:
+        return
+    cursor.execute("""
+        INSERT INTO data_import_checkpoints
+            (import_log_id, source_hash, start_offset, end_offset, start_row, end_row, rows_committed, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, (
+        import_log_id, source_hash,
+        parsed["start_offset"], parsed["end_offset"],
+        parsed["start_row"], parsed["end_row"],
+        rows_committed, status
+    ))
+
+
+def load_completed_ranges(cursor, source_hash: str) -> List[Tuple[int, int]]:
+    """
+    加载同一源文件已提交或已隔离的字节范围，并合并相邻/重叠区间
+
+    Returns:
+        按起始偏移排序的 [(start_offset, end_offset), ...]
+    """
+    cursor.execute("""
+        SELECT start_offset, end_offset
+        FROM data_import_checkpoints
+        WHERE source_hash = %s AND status IN ('committed', 'quarantined')
+        ORDER BY start_offset
+    """, (source_hash,))
+
+    merged = []
+    for start, end in cursor.fetchall():
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def is_range_completed(completed_ranges: List[Tuple[int, int]], start: int, end: int) -> bool:
+    """判断 [start, end) 是否完全落在已完成的区间内"""
+    idx = bisect.bisect_right(completed_ranges, (start, float('inf'))) - 1
+    return idx >= 0 and completed_ranges[idx][1] >= end
+
+
+class RejectWriter:
+    """隔离文件写入器：首次写入时才创建文件，并复制源文件表头，便于之后单独重新导入"""
+
+    def __init__(self, path: str, source_file: str, append: bool = False):
+        self.path = path
+        self.source_file = source_file
+        self.append = append
+        self._handle = None
+
+    def _open(self):
+        if self._handle is None:
+            has_content = self.append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+            self._handle = open(self.path, 'a' if self.append else 'w', encoding='utf-8')
+            if not has_content:
+                with open(self.source_file, 'r', encoding='utf-8') as src:
+                    self._handle.write(src.readline())
+        return self._handle
+
+    def write_rows(self, rows: List[Tuple[int, str]]) -> int:
+        """写入 [(row_num, line), ...]，返回写入行数"""
+        if not rows:
+            return 0
+        handle = self._open()
+        for _, line in rows:
+            handle.write(line + '\n')
+        handle.flush()
+        return len(rows)
+
+    def write_chunk(self, parsed: dict) -> int:
+        """隔离整个数据块（已作为解析失败行写入的行除外）"""
+        already_rejected = {row_num for row_num, _ in parsed["rejected_rows"]}
+        rows = [
+            (row_num, line)
+            for row_num, line in enumerate(parsed["lines"], start=parsed["start_row"])
+            if row_num not in already_rejected
+        ]
+        return self.write_rows(rows)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
 def create_import_log(session, stats: dict, file_path: str):
     """创建导入日志记录"""
     try:
@@ -279,15 +1747,155 @@ def create_import_log(session, stats: dict, file_path: str):
         logger.warning(f"Failed to create import log: {str(e)}")
 
 
-def refresh_materialized_views(session):
-    """刷新物化视图"""
-    try:
-        logger.info("Refreshing materialized views...")
-        session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY SNP_EFFECT_SUMMARY"))
-        session.commit()
-        logger.info("Materialized views refreshed successfully")
-    except Exception as e:
-        logger.warning(f"Failed to refresh materialized views: {str(e)}")
+# ============================================
+# Bulk Load Mode
+# ============================================
+def prepare_bulk_load(session, tables: Tuple[str, ...] = BULK_LOAD_TABLES) -> dict:
+    """
+    为整表重载做准备：删除二级索引和外键，并将表切换为 UNLOGGED
+
+    主键和唯一约束保留（导入依赖它们做 ON CONFLICT）。被删除对象的定义先写入
+    data_import_bulk_state，即使导入中途失败也可以用 finish_bulk_load 恢复。
+    UNLOGGED 表在数据库崩溃后会被清空，只应用于可以重新导入的整表重载。
+
+    Returns:
+        {"indexes": 删除的索引数, "foreign_keys": 删除的外键数}
+    """
+    session.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {BULK_LOAD_STATE_TABLE} (
+            object_name VARCHAR(255) PRIMARY KEY,
+            object_type VARCHAR(20) NOT NULL,
+            table_name VARCHAR(255) NOT NULL,
+            definition TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+    # Foreign keys on, or pointing at, the bulk tables: a logged table can't reference an unlogged one
+    foreign_keys = session.execute(text("""
+        SELECT c.conname, c.conrelid::regclass::text, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        WHERE c.contype = 'f'
+          AND c.conparentid = 0  -- partitions inherit their parent's foreign keys
+          AND (c.conrelid::regclass::text = ANY(:tables) OR c.confrelid::regclass::text = ANY(:tables))
+    """), {"tables": list(tables)}).fetchall()
+
+    # Indexes that don't back a primary key / unique constraint
+    indexes = session.execute(text("""
+        SELECT i.indexname, i.tablename, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = current_schema()
+          AND i.tablename = ANY(:tables)
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint c
+              WHERE c.conindid = (quote_ident(i.schemaname) || '.' || quote_ident(i.indexname))::regclass
+          )
+    """), {"tables": list(tables)}).fetchall()
+
+    for name, table, definition in foreign_keys:
+        session.execute(text(f"""
+            INSERT INTO {BULK_LOAD_STATE_TABLE} (object_name, object_type, table_name, definition)
+            VALUES (:name, 'foreign_key', :table, :definition)
+            ON CONFLICT (object_name) DO NOTHING
+        """), {"name": name, "table": table, "definition": definition})
+        session.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+
+    for name, table, definition in indexes:
+        session.execute(text(f"""
+            INSERT INTO {BULK_LOAD_STATE_TABLE} (object_name, object_type, table_name, definition)
+            VALUES (:name, 'index', :table, :definition)
+            ON CONFLICT (object_name) DO NOTHING
+        """), {"name": name, "table": table, "definition": definition})
+        session.execute(text(f'DROP INDEX "{name}"'))
+
+    for table in _storage_tables(session, tables):
+        session.execute(text(f"ALTER TABLE {table} SET UNLOGGED"))
+    session.commit()
+
+    logger.info(
+        f"Bulk load: dropped {len(indexes)} indexes and {len(foreign_keys)} foreign keys, "
+        f"set {', '.join(tables)} UNLOGGED"
+    )
+    return {"indexes": len(indexes), "foreign_keys": len(foreign_keys)}
+
+
+def _storage_tables(conn, tables: Tuple[str, ...]) -> List[str]:
+    """
+    实际存储数据的表：普通表本身，分区表展开为其分区
+
+    分区父表没有存储，不能切换 LOGGED / UNLOGGED。
+    """
+    rows = conn.execute(text("""
+        SELECT c.relname, c.relkind, array_remove(array_agg(i.inhrelid::regclass::text), NULL)
+        FROM pg_class c
+        LEFT JOIN pg_inherits i ON i.inhparent = c.oid
+        WHERE c.relname = ANY(:tables) AND c.relnamespace = current_schema()::regnamespace
+        GROUP BY c.relname, c.relkind
+    """), {"tables": list(tables)}).fetchall()
+    by_name = {name: (kind, partitions) for name, kind, partitions in rows}
+
+    result = []
+    for table in tables:
+        kind, partitions = by_name.get(table, ('r', []))
+        result.extend(sorted(partitions) if kind == 'p' else [table])
+    return result
+
+
+def _rebuild_index(engine, name: str, definition: str):
+    """在独立连接上重建一个索引（供线程池并行调用）"""
+    with engine.begin() as conn:
+        conn.execute(text(f"SET maintenance_work_mem = '{BULK_LOAD_MAINTENANCE_WORK_MEM}'"))
+        conn.execute(text(definition))
+        conn.execute(text(f"DELETE FROM {BULK_LOAD_STATE_TABLE} WHERE object_name = :name"), {"name": name})
+    return name
+
+
+def finish_bulk_load(engine, workers: int = BULK_LOAD_INDEX_WORKERS, tables: Tuple[str, ...] = BULK_LOAD_TABLES):
+    """
+    结束整表重载：表切回 LOGGED，并行重建索引，恢复外键并 ANALYZE
+
+    按 data_import_bulk_state 中记录的定义恢复，重复调用是安全的；
+    导入失败时也会调用，用于恢复上一次中断留下的索引。
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": BULK_LOAD_STATE_TABLE}).scalar()
+        if exists is None:
+            return
+        pending = conn.execute(text(f"""
+            SELECT object_name, object_type, table_name, definition
+            FROM {BULK_LOAD_STATE_TABLE}
+            ORDER BY created_at
+        """)).fetchall()
+
+        # Referenced tables must be logged before the tables pointing at them
+        for table in _storage_tables(conn, tables):
+            conn.execute(text(f"ALTER TABLE {table} SET LOGGED"))
+
+    # Indexes on a partitioned table are reported as "ON ONLY"; rebuild them on every partition
+    indexes = [
+        (name, definition.replace(" ON ONLY ", " ON ", 1))
+        for name, kind, _, definition in pending if kind == 'index'
+    ]
+    foreign_keys = [(name, table, definition) for name, kind, table, definition in pending if kind == 'foreign_key']
+
+    if indexes:
+        logger.info(f"Rebuilding {len(indexes)} indexes with {max(1, workers)} connections...")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(_rebuild_index, engine, name, definition) for name, definition in indexes]
+            for future in as_completed(futures):
+                logger.info(f"Rebuilt index {future.result()}")
+
+    with engine.begin() as conn:
+        for name, table, definition in foreign_keys:
+            conn.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}'))
+            conn.execute(text(f"DELETE FROM {BULK_LOAD_STATE_TABLE} WHERE object_name = :name"), {"name": name})
+        if foreign_keys:
+            logger.info(f"Restored {len(foreign_keys)} foreign keys")
+
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(text(f"ANALYZE {table}"))
+    logger.info(f"Bulk load finished: {', '.join(tables)} logged and analyzed")
 
 
 # ============================================
@@ -308,7 +1916,70 @@ def main():
         '--batch-size',
         type=int,
         default=BATCH_SIZE,
-        help=f'Batch size for inserts (default: {BATCH_SIZE})'
+        help=f'Rows per streamed chunk; each chunk is committed as one transaction (default: {BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--max-memory-mb',
+        type=int,
+        default=MAX_MEMORY_MB,
+        help=f'Approximate memory ceiling for one in-flight chunk (default: {MAX_MEMORY_MB})'
+    )
+    parser.add_argument(
+        '--mode',
+        choices=IMPORT_MODES,
+        default='row',
+        help='Loader mode: row (per-row upserts) or copy (COPY into staging + set-based merge)'
+    )
+    parser.add_argument(
+        '--storage',
+        choices=EFFECT_STORAGES,
+        default='rows',
+        help='Effect storage: rows (snp_effects), vectors (one packed snp_effect_vectors row per SNP) or both'
+    )
+    parser.add_argument(
+        '--effect-abs-limit',
+        type=float,
+        default=EFFECT_ABS_LIMIT,
+        help=f'Report effect values beyond +/- this as out of range (default: {EFFECT_ABS_LIMIT})'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of worker processes; >1 splits the file into line-aligned byte-range shards'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Skip chunks already checkpointed for this file (matched by SHA-256)'
+    )
+    parser.add_argument(
+        '--max-retries',
+        type=int,
+        default=MAX_RETRIES,
+        help=f'Retries for a failed chunk before it is quarantined (default: {MAX_RETRIES})'
+    )
+    parser.add_argument(
+        '--reject-file',
+        type=str,
+        default=None,
+        help='File that quarantined rows are written to (default: <file>.rejects.tsv)'
+    )
+    parser.add_argument(
+        '--delta',
+        action='store_true',
+        help='Only write SNPs that are new or whose effect fingerprint changed'
+    )
+    parser.add_argument(
+        '--delete-missing',
+        action='store_true',
+        help='Delete SNPs that are not present in the input file (not allowed with --resume)'
+    )
+    parser.add_argument(
+        '--bulk-load',
+        action='store_true',
+        help='Full reload: drop secondary indexes and foreign keys, load into UNLOGGED tables, '
+             'then rebuild indexes in parallel and ANALYZE (tables are lost if the server crashes mid-load)'
     )
     parser.add_argument(
         '--skip-targets',
@@ -318,7 +1989,12 @@ def main():
     parser.add_argument(
         '--refresh-views',
         action='store_true',
-        help='Refresh materialized views after import'
+        help='Rebuild snp_effect_summary from scratch after import (it is otherwise maintained per chunk)'
+    )
+    parser.add_argument(
+        '--skip-annotation',
+        action='store_true',
+        help='Do not annotate new SNPs with their nearest gene and region (run annotate_snps.py later)'
     )
 
     args = parser.parse_args()
@@ -328,13 +2004,25 @@ def main():
         logger.error(f"TSV file not found: {args.file}")
         sys.exit(1)
 
+    # Resumed runs don't see the keys of skipped chunks, so they can't tell what disappeared
+    if args.delete_missing and args.resume:
+        logger.error("--delete-missing cannot be combined with --resume")
+        sys.exit(1)
+
     logger.info("=" * 60)
     logger.info("Starting TSV data import...")
     logger.info(f"File: {args.file}")
     logger.info(f"Batch size: {args.batch_size}")
+    logger.info(f"Mode: {args.mode}")
+    logger.info(f"Effect storage: {args.storage}")
+    logger.info(f"Max chunk memory: {args.max_memory_mb} MB")
+    logger.info(f"Workers: {args.workers}")
+    logger.info(f"Bulk load: {args.bulk_load}")
     logger.info("=" * 60)
 
     start_time = datetime.now()
+    session = None
+    import_log_id = None
 
     try:
         # Get database connection
@@ -353,26 +2041,75 @@ def main():
             target_name_to_id = {t.name: t.id for t in existing_targets}
             logger.info(f"Using {len(target_name_to_id)} existing targets")
 
-        # Read TSV data
-        data_rows = read_tsv_data(args.file)
-
-        # Import SNPs and effects
-        stats = import_snps_and_effects(
-            session,
-            data_rows,
-            target_name_to_id,
-            args.batch_size
-        )
-
-        # Create import log
-        create_import_log(session, stats, args.file)
-
-        # Refresh materialized views
+        # Start import log; chunk checkpoints are recorded under it
+        logger.info("Hashing source file...")
+        source_hash = compute_file_hash(args.file)
+        import_log_id = start_import_log(session, args.file, source_hash)
+
+        # Stream and import SNPs and effects
+        import_options = {
+            "mode": args.mode,
+            "storage": args.storage,
+            "chunk_size": args.batch_size,
+            "max_memory_mb": args.max_memory_mb,
+            "effect_abs_limit": args.effect_abs_limit,
+            "import_log_id": import_log_id,
+            "source_hash": source_hash,
+            "resume": args.resume,
+            "max_retries": args.max_retries,
+            "reject_file": args.reject_file,
+            "delta": args.delta,
+            "delete_missing": args.delete_missing,
+            "bulk_load": args.bulk_load
+        }
+        if args.delete_missing:
+            with session.connection().connection.cursor() as cursor:
+                create_seen_keys_table(cursor)
+            session.commit()
+
+        if args.bulk_load:
+            prepare_bulk_load(session)
+        try:
+            if args.workers > 1:
+                stats = import_snps_and_effects_parallel(
+                    args.file,
+                    target_name_to_id,
+                    args.workers,
+                    **import_options
+                )
+            else:
+                stats = import_snps_and_effects(
+                    session,
+                    args.file,
+                    target_name_to_id,
+                    **import_options
+                )
+        finally:
+            # Restore indexes and foreign keys before anything relies on them (e.g. cascading deletes)
+            if args.bulk_load:
+                session.rollback()
+                finish_bulk_load(engine, workers=max(args.workers, BULK_LOAD_INDEX_WORKERS))
+
+        # Delete SNPs that disappeared from the input, only if every row was accounted for
+        if args.delete_missing:
+            if stats["errors"] or stats["rows_quarantined"]:
+                logger.warning("Import had errors; skipping deletion of missing SNPs")
+            else:
+                stats["snps_deleted"] = delete_missing_snps(session)
+
+        # Complete import log
+        finish_import_log(session, import_log_id, stats, args.file)
+
+        # Full summary rebuild (the summary is already maintained per chunk)
         if args.refresh_views:
-            refresh_materialized_views(session)
+            rebuild_effect_summary(session)
 
         session.close()
 
+        # Nearest gene and region of the new SNPs, for the detail endpoint and list filters
+        if not args.skip_annotation:
+            annotate_new_snps()
+
         # Print summary
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
@@ -384,12 +2121,27 @@ def main():
         logger.info(f"SNPs skipped: {stats['snps_skipped']}")
         logger.info(f"Effects imported: {stats['effects_imported']}")
         logger.info(f"Effects skipped: {stats['effects_skipped']}")
+        logger.info(f"max_abs_sad mismatches: {stats['max_abs_sad_mismatches']}")
+        logger.info(f"Duplicate SNPs (within chunk): {stats['duplicate_snps']}")
+        logger.info(f"Out-of-range effect values: {stats['out_of_range_effects']}")
+        if args.delta:
+            logger.info(f"SNPs inserted: {stats['snps_inserted']}")
+            logger.info(f"SNPs updated: {stats['snps_updated']}")
+            logger.info(f"SNPs unchanged: {stats['snps_unchanged']}")
+            logger.info(f"Stale effect values deleted: {stats['effects_deleted']}")
+        if args.delete_missing:
+            logger.info(f"SNPs deleted: {stats['snps_deleted']}")
+        logger.info(f"Chunks skipped (resumed): {stats['chunks_resumed']}")
+        logger.info(f"Rows quarantined: {stats['rows_quarantined']}")
         if stats['errors']:
             logger.info(f"Errors: {len(stats['errors'])}")
         logger.info("=" * 60)
 
     except Exception as e:
         logger.error(f"Import failed: {str(e)}")
+        if session is not None and import_log_id is not None:
+            session.rollback()
+            finish_import_log(session, import_log_id, {"errors": [str(e)]}, args.file, status='failed')
         sys.exit(1)
 
 
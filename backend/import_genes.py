@@ -4,21 +4,25 @@ Import Gene Annotations from GTF File
 从 GTF 文件导入基因注释数据
 ============================================
 
-Usage: python import_genes.py
+Usage:
+    python import_genes.py                 # merge into existing genes (default)
+    python import_genes.py --replace       # truncate genes and reload
+    python import_genes.py --file ../database/reference/Bos_taurus.ARS-UCD1.2.110.gtf.gz --no-cache
+
+To load genes, transcripts and exons in a single pass, use import_gtf.py.
 """
 
-import sys
+import argparse
+import logging
 import os
-import gzip
+import sys
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from main import Base, GeneModel
-from datetime import datetime
-import logging
+from main import Base
+from import_gtf import GENE_COLUMNS, GENE_KEY, bump_annotation_version, merge_rows, parse_gtf
 
 # ============================================
 # Configuration
@@ -45,166 +49,86 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# ============================================
-# Database Setup
-# ============================================
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
 
-# Create tables
-logger.info("Creating database tables...")
-Base.metadata.create_all(engine)
-logger.info("Tables created successfully")
+def import_genes(file_path: str = GTF_FILE, replace: bool = False, use_cache: bool = True) -> int:
+    """
+    导入基因注释（不交互）
 
+    默认合并：新基因插入，已存在的基因（按 gene_id）更新坐标和名称；
+    replace=True 时先清空 genes 再导入。转录本和外显子不受影响。
+    写入方式与 import_gtf.py 相同（COPY 到暂存表 + INSERT ... ON CONFLICT），GTF 的解析结果优先从缓存读取。
 
-def parse_gtf_file(gtf_file_path):
+    Returns:
+        插入或更新的基因数
     """
-    Parse GTF file and yield gene records
+    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 
-    GTF format:
-    seqname   source   feature   start   end   score   strand   frame   attribute
-    """
-    logger.info(f"Parsing GTF file: {gtf_file_path}")
-
-    open_func = gzip.open if gtf_file_path.endswith('.gz') else open
-    genes_added = 0
-    genes_skipped = 0
-
-    with open_func(gtf_file_path, 'rt') as f:
-        for line_num, line in enumerate(f, 1):
-            # Skip comments
-            if line.startswith('#'):
-                continue
-
-            parts = line.strip().split('\t')
-            if len(parts) < 9:
-                continue
-
-            seqname = parts[0]
-            source = parts[1]
-            feature = parts[2]
-            start = int(parts[3])
-            end = int(parts[4])
-            score = parts[5]
-            strand = parts[6]
-            frame = parts[7]
-            attributes = parts[8]
-
-            # Only process gene features
-            if feature.lower() != 'gene':
-                continue
-
-            # Parse attributes
-            attr_dict = {}
-            for attr in attributes.split(';'):
-                attr = attr.strip()
-                if not attr:
-                    continue
-                if ' ' in attr:
-                    key, value = attr.split(' ', 1)
-                    key = key.strip()
-                    value = value.strip().strip('"')
-                    attr_dict[key] = value
-
-            gene_id = attr_dict.get('gene_id', '')
-            gene_name = attr_dict.get('gene_name', attr_dict.get('Name', ''))
-            gene_type = attr_dict.get('gene_type', attr_dict.get('gene_biotype', ''))
-            description = attr_dict.get('description', '')
-
-            # Clean chromosome name (remove 'chr' prefix if present)
-            chrom = seqname.replace('chr', '').replace('CHR', '')
-
-            if not gene_id:
-                logger.warning(f"Line {line_num}: Missing gene_id, skipping")
-                genes_skipped += 1
-                continue
-
-            yield {
-                'gene_id': gene_id,
-                'gene_name': gene_name or None,
-                'chrom': chrom,
-                'start_pos': start,
-                'end_pos': end,
-                'strand': strand,
-                'gene_biotype': gene_type or None
-            }
-
-            genes_added += 1
-
-            if genes_added % 1000 == 0:
-                logger.info(f"Processed {genes_added} genes...")
-
-    logger.info(f"Finished parsing GTF file. Total genes: {genes_added}, Skipped: {genes_skipped}")
-
-
-def import_genes():
-    """Import genes from GTF file to database"""
-    session = Session()
+    # Create tables
+    logger.info("Creating database tables if not exists...")
+    Base.metadata.create_all(engine)
+    logger.info("Tables ready")
+
+    parsed = parse_gtf(file_path, features=("gene",), use_cache=use_cache)
+    logger.info(f"Parsed {len(parsed['genes'])} genes (skipped {parsed['skipped']} features with missing ids)")
 
+    connection = engine.raw_connection()
     try:
-        # Check if genes table already has data
-        existing_count = session.query(GeneModel).count()
-        if existing_count > 0:
-            logger.warning(f"Database already contains {existing_count} genes")
-            response = input("Do you want to clear existing genes and re-import? (yes/no): ")
-            if response.lower() != 'yes':
-                logger.info("Import cancelled")
-                return
-
-            # Clear existing genes
-            logger.info("Clearing existing genes...")
-            session.query(GeneModel).delete()
-            session.commit()
-            logger.info("Existing genes cleared")
-
-        # Parse and import genes
-        logger.info("Starting gene import...")
-        batch_size = 1000
-        batch = []
-        total_imported = 0
-
-        for gene_data in parse_gtf_file(GTF_FILE):
-            batch.append(GeneModel(**gene_data))
-
-            if len(batch) >= batch_size:
-                session.bulk_save_objects(batch)
-                session.commit()
-                total_imported += len(batch)
-                logger.info(f"Imported {total_imported} genes so far...")
-                batch = []
-
-        # Import remaining genes in batch
-        if batch:
-            session.bulk_save_objects(batch)
-            session.commit()
-            total_imported += len(batch)
-
-        logger.info(f"Gene import completed successfully! Total genes imported: {total_imported}")
-
-        # Verify import
-        final_count = session.query(GeneModel).count()
-        logger.info(f"Verification: Database now contains {final_count} genes")
+        with connection.cursor() as cursor:
+            if replace:
+                logger.info("Clearing existing genes...")
+                cursor.execute("TRUNCATE genes RESTART IDENTITY")
+
+            logger.info("Importing genes...")
+            imported = merge_rows(cursor, "genes", GENE_COLUMNS, GENE_KEY, parsed["genes"])
+            logger.info(f"Imported {imported} genes")
+
+            # Genes changed outside import_gtf.py: new annotation version, no cache to build the index from
+            bump_annotation_version(cursor)
+            connection.commit()
+
+            # Verify
+            cursor.execute("SELECT count(*) FROM genes")
+            logger.info(f"Verification: Database now contains {cursor.fetchone()[0]} genes")
 
     except Exception as e:
-        session.rollback()
+        connection.rollback()
         logger.error(f"Error during import: {str(e)}")
         raise
     finally:
-        session.close()
+        connection.close()
+        engine.dispose()
 
+    return imported
 
-if __name__ == "__main__":
-    if not os.path.exists(GTF_FILE):
-        logger.error(f"GTF file not found: {GTF_FILE}")
-        logger.error(f"Please ensure the file exists at: {os.path.abspath(GTF_FILE)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Import gene annotations from a GTF file')
+    parser.add_argument('--file', default=GTF_FILE, help=f'Path to GTF file, can be gzipped (default: {GTF_FILE})')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--replace', action='store_true', help='Truncate genes and reload them')
+    mode.add_argument('--merge', action='store_true',
+                      help='Insert new genes and update existing ones (default)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse the GTF text even if a cached copy exists, and do not write one')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        logger.error(f"GTF file not found: {args.file}")
+        logger.error(f"Please ensure the file exists at: {os.path.abspath(args.file)}")
         sys.exit(1)
 
-    logger.info("="*60)
+    logger.info("=" * 60)
     logger.info("Gene Annotation Import Tool")
-    logger.info("="*60)
+    logger.info("=" * 60)
     logger.info(f"Database: {DATABASE_URL}")
-    logger.info(f"GTF File: {GTF_FILE}")
-    logger.info("="*60)
+    logger.info(f"GTF File: {args.file}")
+    logger.info(f"Mode: {'replace' if args.replace else 'merge'}")
+    logger.info("=" * 60)
+
+    import_genes(args.file, replace=args.replace, use_cache=not args.no_cache)
+    logger.info("Import process completed! Run annotate_snps.py to re-annotate SNPs with the new genes.")
 
-    import_genes()
-    logger.info("Import process completed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Cattle SNP Effect Value Database - Backend Tests
+牛变异效应值数据库 - 后端测试
+"""
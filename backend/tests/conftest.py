@@ -0,0 +1,46 @@
+"""
+pytest 公共配置
+
+后端脚本以平铺模块方式互相导入（from main import ...、from utils import ...），
+这里把 backend 目录加入 sys.path，使测试与脚本的导入方式一致。
+测试不连接 PostgreSQL；需要数据库的用例使用只建所需表的内存 SQLite。
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def sample_tsv() -> str:
+    """仓库自带的示例数据（47 个SNP x 578 个靶点）"""
+    return os.path.join(REPO_DIR, "SNP-disease", "variant_sad_all_targets.tsv")
+
+
+@pytest.fixture
+def sqlite_session():
+    """
+    内存 SQLite 会话工厂：sqlite_session(Model, ...) 只为给定模型建表并返回会话
+
+    ORM 模型中含 PostgreSQL 专用类型（ARRAY、JSONB），因此不能 create_all 整个 Base。
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from main import Base
+
+    engine = create_engine("sqlite://")
+    session = sessionmaker(bind=engine)()
+
+    def create(*models):
+        Base.metadata.create_all(engine, tables=[model.__table__ for model in models])
+        return session
+
+    yield create
+    session.close()
+    engine.dispose()
@@ -0,0 +1,116 @@
+"""main.py：基因注释内存区间索引与 SQL 查询结果一致"""
+
+import pytest
+
+import main
+from main import AnnotationIndex, ExonModel, GeneModel, TranscriptModel, detect_snp_region, find_nearest_gene
+
+GENES = [
+    # (gene_id, gene_name, chrom, start, end, strand, biotype) in id order
+    ("G1", "OUTER", "1", 1000, 5000, "+", "protein_coding"),
+    ("G2", "NESTED", "1", 2000, 3000, "-", "lncRNA"),
+    ("G3", None, "1", 4500, 8000, "+", None),
+    ("G4", "LONE", "1", 12000, 13000, "-", "protein_coding"),
+    ("G5", "INNER", "1", 2200, 2400, "+", "miRNA"),
+    ("G6", "OTHER", "2", 500, 900, "+", "protein_coding"),
+]
+TRANSCRIPTS = [
+    # (transcript_id, gene_id, chrom, start, end)
+    ("T1a", "G1", "1", 1000, 5000),
+    ("T1b", "G1", "1", 1500, 4000),
+    ("T2", "G2", "1", 2000, 3000),
+    ("T3", "G3", "1", 5000, 8000),
+    ("T5", "G5", "1", 2200, 2400),
+]
+EXONS = [
+    # (transcript_id, chrom, start, end, exon_number)
+    ("T1b", "1", 1500, 1600, 1),
+    ("T1a", "1", 1000, 1200, 1),
+    ("T1a", "1", 2500, 2600, 2),
+    ("T1a", "1", 4800, 5000, 3),
+    ("T2", "1", 2000, 2100, 1),
+    ("T2", "1", 2900, 3000, 2),
+    ("T3", "2", 5000, 6000, 1),  # exon on another chromosome than its transcript never matches
+    ("T3", "1", 7000, 7100, 2),
+    ("T5", "1", 2300, 2400, 1),
+]
+
+
+@pytest.fixture
+def db(sqlite_session, monkeypatch):
+    """SQL 路径（annotation_index 为 None）使用的注释表"""
+    session = sqlite_session(GeneModel, TranscriptModel, ExonModel)
+    for i, (gene_id, gene_name, chrom, start, end, strand, biotype) in enumerate(GENES, start=1):
+        session.add(GeneModel(id=i, gene_id=gene_id, gene_name=gene_name, chrom=chrom, start_pos=start,
+                              end_pos=end, strand=strand, gene_biotype=biotype))
+    for i, (transcript_id, gene_id, chrom, start, end) in enumerate(TRANSCRIPTS, start=1):
+        session.add(TranscriptModel(id=i, transcript_id=transcript_id, gene_id=gene_id, chrom=chrom,
+                                    start_pos=start, end_pos=end))
+    for i, (transcript_id, chrom, start, end, exon_number) in enumerate(EXONS, start=1):
+        session.add(ExonModel(id=i, transcript_id=transcript_id, chrom=chrom, start_pos=start, end_pos=end,
+                              exon_number=exon_number))
+    session.commit()
+    monkeypatch.setattr(main, "annotation_index", None)
+    return session
+
+
+@pytest.fixture
+def index():
+    return AnnotationIndex.from_rows(1, GENES, TRANSCRIPTS, EXONS)
+
+
+def probe_points() -> list:
+    points = set(range(0, 14001, 50))
+    for _, _, _, start, end, _, _ in GENES:
+        points.update((start - 1, start, start + 1, end - 1, end, end + 1))
+    for _, _, start, end, _ in EXONS:
+        points.update((start - 1, start, end, end + 1))
+    return sorted(points)
+
+
+def test_index_matches_sql_lookups(db, index):
+    within = 0
+    for chrom in ("1", "2", "3"):
+        for pos in probe_points():
+            expected = find_nearest_gene(db, chrom, pos)
+            assert index.nearest_gene(chrom, pos) == expected, (chrom, pos)
+            if expected is None:
+                continue
+            if expected["location"] == "within":
+                within += 1
+            for gene_id, *_ in GENES:
+                assert index.snp_region(chrom, pos, gene_id) == detect_snp_region(db, chrom, pos, gene_id), \
+                    (chrom, pos, gene_id)
+    assert within
+
+
+@pytest.mark.parametrize("pos, gene_id, location, distance", [
+    (2300, "G1", "within", 0),    # nested three deep: the lowest id wins
+    (4700, "G1", "within", 0),    # overlap of G1 and G3
+    (5500, "G3", "within", 0),
+    (500, "G1", "nearby", 500),   # only a downstream gene
+    (9000, "G3", "nearby", 1000),
+    (11000, "G4", "nearby", 1000),
+    (10000, "G3", "nearby", 2000),  # equal distances: upstream wins
+    (20000, "G4", "nearby", 7000),
+])
+def test_nearest_gene(index, pos, gene_id, location, distance):
+    gene = index.nearest_gene("1", pos)
+    assert (gene["gene_id"], gene["location"], gene["distance"]) == (gene_id, location, distance)
+
+
+def test_nearest_gene_unknown_chromosome(index):
+    assert index.nearest_gene("3", 100) is None
+
+
+@pytest.mark.parametrize("pos, gene_id, region", [
+    (2550, "G1", "exon 2"),
+    (1550, "G1", "intron"),       # first covering transcript T1a wins over T1b's exon
+    (2050, "G2", "exon 1"),
+    (2350, "G5", "exon 1"),
+    (4700, "G3", "intergenic"),   # inside the gene but outside its transcripts
+    (5500, "G3", "intron"),       # the chromosome-2 exon is ignored
+    (12500, "G4", "intergenic"),  # gene without transcripts
+])
+def test_snp_region(index, pos, gene_id, region):
+    assert index.snp_region("1", pos, gene_id) == region
@@ -0,0 +1,229 @@
+"""import_data.py：分块流式读取、解析与校验"""
+
+import numpy as np
+import pytest
+
+import import_data
+from import_data import (
+    build_column_index,
+    compute_shards,
+    iter_effect_rows,
+    parse_effect_block,
+    iter_tsv_chunks,
+    parse_chunk,
+    parse_tsv_header,
+    resolve_target_columns,
+    validate_chunk,
+)
+
+SAMPLE_ROWS = 47
+SAMPLE_TARGETS = 578
+
+
+@pytest.fixture(scope="module")
+def sample_columns(sample_tsv):
+    """(columns, target_columns)：靶点 ID 按列顺序从 1 开始编号"""
+    snp_columns, effect_columns = parse_tsv_header(sample_tsv)
+    target_name_to_id = {name: i for i, name in enumerate(effect_columns, start=1)}
+    return (
+        build_column_index(snp_columns + effect_columns),
+        resolve_target_columns(effect_columns, target_name_to_id)
+    )
+
+
+def read_data_lines(path: str) -> list:
+    with open(path, 'rb') as f:
+        f.readline()
+        return [line.decode('utf-8').rstrip('\r\n') for line in f]
+
+
+# ============================================
+# iter_tsv_chunks / parse_chunk
+# ============================================
+@pytest.mark.parametrize("chunk_size, max_chunk_bytes", [(1, None), (5, None), (1000, None), (1000, 40000)])
+def test_chunks_cover_every_row_with_contiguous_offsets(sample_tsv, chunk_size, max_chunk_bytes):
+    chunks = list(iter_tsv_chunks(sample_tsv, chunk_size, max_chunk_bytes))
+    with open(sample_tsv, 'rb') as f:
+        header_bytes = len(f.readline())
+        data = f.read()
+
+    assert chunks[0]["start_row"] == 1
+    assert chunks[0]["start_offset"] == header_bytes
+    assert chunks[-1]["end_row"] == SAMPLE_ROWS
+    assert chunks[-1]["end_offset"] == header_bytes + len(data)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk["start_row"] == previous["end_row"] + 1
+        assert chunk["start_offset"] == previous["end_offset"]
+    for chunk in chunks:
+        assert len(chunk["lines"]) == chunk["end_row"] - chunk["start_row"] + 1
+        assert len(chunk["lines"]) <= chunk_size
+        raw = data[chunk["start_offset"] - header_bytes:chunk["end_offset"] - header_bytes]
+        assert raw.decode('utf-8').splitlines() == chunk["lines"]
+
+    assert [line for chunk in chunks for line in chunk["lines"]] == read_data_lines(sample_tsv)
+
+
+def test_chunks_resume_from_an_offset(sample_tsv):
+    chunks = list(iter_tsv_chunks(sample_tsv, 10))
+    resumed = list(iter_tsv_chunks(
+        sample_tsv, 10, start_offset=chunks[2]["start_offset"], first_row=chunks[2]["start_row"]
+    ))
+    assert resumed == chunks[2:]
+
+    bounded = list(iter_tsv_chunks(
+        sample_tsv, 10, start_offset=chunks[1]["start_offset"], end_offset=chunks[2]["end_offset"],
+        first_row=chunks[1]["start_row"]
+    ))
+    assert bounded == chunks[1:3]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_parse_chunk_round_trip(sample_tsv, sample_columns, chunk_size):
+    columns, target_columns = sample_columns
+    parsed = [parse_chunk(chunk, columns, target_columns) for chunk in iter_tsv_chunks(sample_tsv, chunk_size)]
+
+    snps = [snp for chunk in parsed for snp in chunk["snps"]]
+    assert [snp[0] for snp in snps] == list(range(1, SAMPLE_ROWS + 1))
+    assert sum(chunk["snps_skipped"] for chunk in parsed) == 0
+    assert sum(chunk["effects_valid"] for chunk in parsed) == SAMPLE_ROWS * SAMPLE_TARGETS
+
+    for snp, line in zip(snps, read_data_lines(sample_tsv)):
+        fields = line.split('\t')
+        assert snp[1:7] == (fields[0], int(fields[1]), fields[2] or None, fields[3], fields[4], float(fields[5]))
+
+    # Row fingerprints depend only on the row, never on how the file was chunked
+    whole = [parse_chunk(chunk, columns, target_columns) for chunk in iter_tsv_chunks(sample_tsv, SAMPLE_ROWS)]
+    assert [snp[7] for snp in snps] == [snp[7] for chunk in whole for snp in chunk["snps"]]
+
+
+def test_parse_chunk_skips_rows_missing_required_fields(sample_columns):
+    columns, target_columns = sample_columns
+    cells = ['0.5'] * SAMPLE_TARGETS
+    chunk = {
+        "start_row": 1, "end_row": 2, "start_offset": 0, "end_offset": 0,
+        "lines": [
+            '\t'.join(['1', '100', 'rs1', 'A', 'G', '0.5'] + cells),
+            '\t'.join(['1', '', 'rs2', 'A', 'G', '0.5'] + cells),
+        ]
+    }
+    parsed = parse_chunk(chunk, columns, target_columns)
+    assert [snp[3] for snp in parsed["snps"]] == ['rs1']
+    assert parsed["snps_skipped"] == 1
+    assert parsed["effects"].shape == (1, SAMPLE_TARGETS)
+
+
+def test_chunk_size_is_bounded_by_bytes(sample_tsv):
+    max_chunk_bytes = 30000
+    chunks = list(iter_tsv_chunks(sample_tsv, import_data.BATCH_SIZE, max_chunk_bytes=max_chunk_bytes))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        # A chunk closes on the first line that reaches the byte limit
+        assert sum(len(line) + 1 for line in chunk["lines"][:-1]) < max_chunk_bytes
+    assert sum(len(chunk["lines"]) for chunk in chunks) == SAMPLE_ROWS
+
+
+# ============================================
+# parse_effect_block / validate_chunk
+# ============================================
+def test_sample_file_validates_clean(sample_tsv, sample_columns):
+    columns, target_columns = sample_columns
+    for chunk in iter_tsv_chunks(sample_tsv, 10):
+        parsed = parse_chunk(chunk, columns, target_columns)
+        assert parsed["effects"].dtype == np.float32
+        assert parsed["effect_mask"] is None
+        assert validate_chunk(parsed) == {
+            "max_abs_sad_mismatches": 0, "duplicate_snps": 0, "out_of_range_effects": 0
+        }
+
+
+def test_effect_matrix_matches_file_values(sample_tsv, sample_columns):
+    columns, target_columns = sample_columns
+    parsed = parse_chunk(next(iter_tsv_chunks(sample_tsv, SAMPLE_ROWS)), columns, target_columns)
+    expected = np.array(
+        [[float(cell) for cell in line.split('\t')[6:]] for line in read_data_lines(sample_tsv)], dtype=np.float32
+    )
+    assert parsed["effects"].shape == (SAMPLE_ROWS, SAMPLE_TARGETS)
+    np.testing.assert_array_equal(parsed["effects"], expected)
+
+
+def test_parse_effect_block_blank_and_invalid_cells():
+    matrix, mask = parse_effect_block(['1.5', '', 'x', '-2'], 2, 2)
+    np.testing.assert_array_equal(matrix[0], [1.5, 0.0])
+    assert np.isnan(matrix[1, 0]) and matrix[1, 1] == -2.0
+    np.testing.assert_array_equal(mask, [[True, True], [False, True]])
+
+    matrix, mask = parse_effect_block(['1', '2'], 1, 2)
+    assert mask is None
+
+
+def test_validate_chunk_reports_problems_without_changing_data():
+    columns = build_column_index(['chrom', 'pos', 'id', 'ref', 'alt', 'max_abs_sad', 't1', 't2'])
+    target_columns = [(6, 1), (7, 2)]
+    chunk = {
+        "start_row": 1, "end_row": 4, "start_offset": 0, "end_offset": 0,
+        "lines": [
+            '1\t100\trs1\tA\tG\t0.5\t0.5\t-0.25',
+            '1\t100\trs1\tA\tG\t0.5\t0.5\t-0.25',   # duplicate SNP
+            '1\t200\trs2\tC\tT\t9.0\t1.0\tbad',     # max_abs_sad mismatch, invalid cell
+            '2\t300\trs3\tG\tA\t500\t500\t0.1',     # out of range
+        ]
+    }
+    parsed = parse_chunk(chunk, columns, target_columns)
+    effects = parsed["effects"].copy()
+
+    assert validate_chunk(parsed, effect_abs_limit=100.0) == {
+        "max_abs_sad_mismatches": 1, "duplicate_snps": 1, "out_of_range_effects": 1
+    }
+    np.testing.assert_array_equal(parsed["effects"], effects)
+    assert parsed["effects_valid"] == 7 and parsed["effects_skipped"] == 1
+    assert list(iter_effect_rows(parsed))[2] == [1.0, None]
+
+
+# ============================================
+# compute_shards
+# ============================================
+def assert_shards_partition_file(path: str, shards: list):
+    with open(path, 'rb') as f:
+        content = f.read()
+    header_bytes = content.index(b'\n') + 1
+
+    assert [shard["index"] for shard in shards] == list(range(len(shards)))
+    assert shards[0]["start_offset"] == header_bytes
+    assert shards[-1]["end_offset"] == len(content)
+    for previous, shard in zip(shards, shards[1:]):
+        assert shard["start_offset"] == previous["end_offset"]
+    for shard in shards:
+        assert content[shard["start_offset"] - 1:shard["start_offset"]] == b'\n'
+        assert shard["first_row"] == content.count(b'\n', header_bytes, shard["start_offset"]) + 1
+
+    # Reading every shard reproduces single-process row numbers and lines
+    rows = []
+    for shard in shards:
+        for chunk in iter_tsv_chunks(path, 10, start_offset=shard["start_offset"],
+                                     end_offset=shard["end_offset"], first_row=shard["first_row"]):
+            rows.extend(enumerate(chunk["lines"], start=chunk["start_row"]))
+    assert rows == list(enumerate(read_data_lines(path), start=1))
+
+
+@pytest.mark.parametrize("num_shards", [1, 2, 3, 8, SAMPLE_ROWS])
+def test_shards_partition_sample_file_on_line_starts(sample_tsv, num_shards):
+    shards = compute_shards(sample_tsv, num_shards)
+    assert 1 <= len(shards) <= num_shards
+    assert all(shard["end_offset"] > shard["start_offset"] for shard in shards)
+    assert_shards_partition_file(sample_tsv, shards)
+
+
+def test_more_shards_than_lines(tmp_path):
+    path = tmp_path / "small.tsv"
+    path.write_text("chrom\tpos\n1\t100\n1\t200\n1\t300\n")
+    shards = compute_shards(str(path), 10)
+    assert len(shards) <= 3
+    assert all(shard["end_offset"] > shard["start_offset"] for shard in shards)
+    assert_shards_partition_file(str(path), shards)
+
+
+def test_header_only_file_has_one_empty_shard(tmp_path):
+    path = tmp_path / "empty.tsv"
+    path.write_text("chrom\tpos\n")
+    shards = compute_shards(str(path), 4)
+    assert shards == [{"index": 0, "start_offset": 10, "end_offset": 10, "first_row": 1}]
@@ -0,0 +1,115 @@
+"""import_gtf.py：GTF 解析与列式缓存"""
+
+import gzip
+
+import numpy as np
+import pytest
+
+import import_gtf
+from import_gtf import gtf_cache_path, load_gtf_cache, load_gtf_columns, parse_gtf, parse_gtf_text
+from main import AnnotationIndex
+from utils import compute_file_hash
+
+GTF_LINES = [
+    "#!genome-build ARS-UCD1.2",
+    'chr1\tensembl\tgene\t1000\t5000\t.\t+\t.\tgene_id "G1"; gene_name "OUTER"; gene_biotype "protein_coding";',
+    'chr1\tensembl\ttranscript\t1000\t5000\t.\t+\t.\tgene_id "G1"; transcript_id "T1";',
+    'chr1\tensembl\texon\t1000\t1200\t.\t+\t.\tgene_id "G1"; transcript_id "T1"; exon_number "1";',
+    'chr1\tensembl\tCDS\t1050\t1200\t.\t+\t0\tgene_id "G1"; transcript_id "T1"; exon_number "1";',
+    'chr1\tensembl\texon\t4000\t5000\t.\t+\t.\tgene_id "G1"; transcript_id "T1"; exon_number "2";',
+    'chr1\tensembl\tgene\t2000\t3000\t.\t-\t.\tgene_id "G2";',
+    'chr1\tensembl\ttranscript\t2000\t3000\t.\t-\t.\tgene_id "G2"; transcript_id "T2";',
+    'chr1\tensembl\texon\t2000\t2100\t.\t-\t.\tgene_id "G2"; transcript_id "T2"; exon_number "1";',
+    'chr1\tensembl\texon\t2900\t3000\t.\t-\t.\tgene_id "G2"; transcript_id "T2";',
+    'X\tensembl\tgene\t100\t900\t.\t+\t.\tgene_id "G3"; gene_name "STALE"; gene_biotype "lncRNA";',
+    'X\tensembl\tgene\t100\t950\t.\t+\t.\tgene_id "G3"; gene_name "SEXLINKED"; gene_biotype "lncRNA";',
+    'X\tensembl\ttranscript\t100\t950\t.\t+\t.\tgene_id "G3"; transcript_id "T3";',
+    'X\tensembl\texon\t100\t300\t.\t+\t.\tgene_id "G3"; transcript_id "T3"; exon_number "1";',
+]
+
+
+@pytest.fixture(params=["annotation.gtf", "annotation.gtf.gz"])
+def gtf_file(request, tmp_path) -> str:
+    path = str(tmp_path / request.param)
+    text = "\n".join(GTF_LINES) + "\n"
+    if path.endswith(".gz"):
+        with gzip.open(path, "wt") as f:
+            f.write(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text)
+    return path
+
+
+def test_parse_gtf_text(gtf_file):
+    parsed = parse_gtf_text(gtf_file)
+    assert parsed["genes"] == [
+        ("G1", "OUTER", "1", 1000, 5000, "+", "protein_coding"),
+        ("G2", None, "1", 2000, 3000, "-", None),
+        ("G3", "SEXLINKED", "X", 100, 950, "+", "lncRNA"),  # the later duplicate wins
+    ]
+    assert parsed["transcripts"] == [
+        ("T1", "G1", "1", 1000, 5000, "+"),
+        ("T2", "G2", "1", 2000, 3000, "-"),
+        ("T3", "G3", "X", 100, 950, "+"),
+    ]
+    assert parsed["exons"] == [
+        ("T1", "1", 1000, 1200, 1),
+        ("T1", "1", 4000, 5000, 2),
+        ("T2", "1", 2000, 2100, 1),
+        ("T3", "X", 100, 300, 1),
+    ]
+    assert parsed["skipped"] == 1  # exon without exon_number
+
+
+def test_cache_round_trip(gtf_file, monkeypatch):
+    expected = parse_gtf_text(gtf_file)
+    checksum = compute_file_hash(gtf_file)
+    assert load_gtf_cache(gtf_file, checksum) is None
+
+    assert parse_gtf(gtf_file) == expected
+    cache_path = gtf_cache_path(gtf_file, checksum)
+    assert load_gtf_cache(gtf_file, checksum) == expected
+
+    # A cache hit never re-reads the GTF text
+    def fail(*args, **kwargs):
+        raise AssertionError("GTF text parsed despite a cache hit")
+    monkeypatch.setattr(import_gtf, "parse_gtf_text", fail)
+    assert parse_gtf(gtf_file) == expected
+    assert parse_gtf(gtf_file, features=("gene",)) == dict(expected, transcripts=[], exons=[])
+
+    columns = load_gtf_columns(cache_path, checksum)
+    assert columns["genes"]["gene_id"].tolist() == ["G1", "G2", "G3"]
+    assert columns["exons"]["exon_number"].dtype == np.int64
+
+
+def test_stale_or_unreadable_cache_is_ignored(gtf_file):
+    checksum = compute_file_hash(gtf_file)
+    cache_path = gtf_cache_path(gtf_file, checksum)
+    parse_gtf(gtf_file)
+
+    assert load_gtf_columns(cache_path, "0" * 64) is None
+    assert load_gtf_columns(cache_path + ".missing", checksum) is None
+
+    with open(cache_path, "wb") as f:
+        f.write(b"not an npz archive")
+    assert load_gtf_cache(gtf_file, checksum) is None
+    assert parse_gtf(gtf_file) == parse_gtf_text(gtf_file)
+    assert load_gtf_cache(gtf_file, checksum) is not None
+
+
+def test_annotation_index_from_cache_matches_rows(gtf_file):
+    parsed = parse_gtf(gtf_file)
+    checksum = compute_file_hash(gtf_file)
+    columns = load_gtf_columns(gtf_cache_path(gtf_file, checksum), checksum)
+
+    from_cache = AnnotationIndex.from_columns(3, columns)
+    from_rows = AnnotationIndex.from_rows(
+        3, parsed["genes"], [row[:5] for row in parsed["transcripts"]], parsed["exons"]
+    )
+    assert from_cache.genes == from_rows.genes
+    for chrom in ("1", "X", "2"):
+        for pos in range(0, 6001, 25):
+            assert from_cache.nearest_gene(chrom, pos) == from_rows.nearest_gene(chrom, pos)
+            for gene_id in ("G1", "G2", "G3"):
+                assert from_cache.snp_region(chrom, pos, gene_id) == from_rows.snp_region(chrom, pos, gene_id)
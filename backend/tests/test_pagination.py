@@ -0,0 +1,134 @@
+"""main.py：键集（游标）分页"""
+
+import pytest
+from fastapi import HTTPException
+
+from main import SNPEffectSummaryModel, SNPModel, decode_cursor, encode_cursor, keyset_page
+
+PAGE_SIZE = 4
+
+
+# ============================================
+# Cursor encoding
+# ============================================
+@pytest.mark.parametrize("value", [0.125, -3, None, "rs123", "1"])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor("mean_effect", "desc", "next", value, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "mean_effect", "desc") == {
+        "s": "mean_effect", "o": "desc", "d": "next", "v": value, "id": 42
+    }
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "e30", encode_cursor("pos", "asc", "sideways", 1, 1)])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, "pos", "asc")
+    assert exc.value.status_code == 400
+
+
+def test_cursor_for_another_sort_is_rejected():
+    cursor = encode_cursor("pos", "asc", "next", 100, 1)
+    for sort_by, sort_order in (("pos", "desc"), ("max_abs_sad", "asc")):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor, sort_by, sort_order)
+        assert exc.value.status_code == 400
+
+
+# ============================================
+# keyset_page
+# ============================================
+@pytest.fixture
+def db(sqlite_session):
+    """
+    30 个SNP：位置只有 3 种取值（大量相同排序键）；
+    mean_effect 只有 4 种取值，id 为 5 的倍数的SNP没有汇总行，id 为 7 的倍数的汇总值为 NULL
+    """
+    session = sqlite_session(SNPModel, SNPEffectSummaryModel)
+    for snp_id in range(1, 31):
+        session.add(SNPModel(
+            id=snp_id, chrom="1", pos=1000 * (snp_id % 3), rs_id=f"rs{snp_id}",
+            ref_allele="A", alt_allele="G", max_abs_sad=0.5
+        ))
+        if snp_id % 5:
+            mean = None if snp_id % 7 == 0 else (snp_id % 4) * 0.25
+            session.add(SNPEffectSummaryModel(snp_id=snp_id, total_targets=578, mean_effect=mean))
+    session.commit()
+    return session
+
+
+def page_query(db):
+    return db.query(SNPModel, SNPEffectSummaryModel).outerjoin(
+        SNPEffectSummaryModel, SNPEffectSummaryModel.snp_id == SNPModel.id
+    )
+
+
+def sort_spec(sort_by: str):
+    """(sort_column, sort_value)，与 get_snps 的取法一致"""
+    if sort_by == "mean_effect":
+        return (
+            SNPEffectSummaryModel.mean_effect,
+            lambda row: row[1].mean_effect if row[1] is not None else None
+        )
+    column = getattr(SNPModel, sort_by)
+    return column, lambda row: getattr(row[0], column.key)
+
+
+def expected_order(db, sort_by: str, sort_order: str) -> list:
+    """排序值为空的行排在最后，id 决定相同排序值的先后"""
+    _, sort_value = sort_spec(sort_by)
+    rows = page_query(db).all()
+    sign = -1 if sort_order == "desc" else 1
+    rows.sort(key=lambda row: (
+        sort_value(row) is None,
+        sign * sort_value(row) if sort_value(row) is not None else 0,
+        sign * row[0].id
+    ))
+    return [row[0].id for row in rows]
+
+
+def fetch_page(db, sort_by: str, sort_order: str, cursor: str = None) -> tuple:
+    sort_column, sort_value = sort_spec(sort_by)
+    state = decode_cursor(cursor, sort_by, sort_order) if cursor else None
+    rows, next_cursor, prev_cursor = keyset_page(
+        page_query(db), sort_column, sort_by, sort_order, state, PAGE_SIZE, sort_value
+    )
+    return [row[0].id for row in rows], next_cursor, prev_cursor
+
+
+@pytest.mark.parametrize("sort_by", ["id", "pos", "mean_effect"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_pages_walk_forward_and_back_in_a_stable_order(db, sort_by, sort_order):
+    expected = expected_order(db, sort_by, sort_order)
+
+    pages, cursor = [], None
+    while True:
+        ids, next_cursor, prev_cursor = fetch_page(db, sort_by, sort_order, cursor)
+        assert (prev_cursor is None) == (cursor is None)
+        pages.append(ids)
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    assert [snp_id for page in pages for snp_id in page] == expected
+    assert all(len(page) == PAGE_SIZE for page in pages[:-1])
+
+    # Walking back from the last page returns the same pages
+    cursor = fetch_page(db, sort_by, sort_order, cursor)[2]
+    for page in reversed(pages[:-1]):
+        ids, next_cursor, prev_cursor = fetch_page(db, sort_by, sort_order, cursor)
+        assert ids == page
+        assert next_cursor is not None
+        cursor = prev_cursor
+    assert cursor is None
+
+
+def test_snps_without_summary_rows_sort_last(db):
+    expected = expected_order(db, "mean_effect", "asc")
+    null_ids = [snp_id for snp_id in range(1, 31) if snp_id % 5 == 0 or snp_id % 7 == 0]
+    assert sorted(expected[-len(null_ids):]) == null_ids
+
+
+def test_empty_result_has_no_cursors(db):
+    sort_column, sort_value = sort_spec("pos")
+    query = page_query(db).filter(SNPModel.chrom == "X")
+    assert keyset_page(query, sort_column, "pos", "asc", None, PAGE_SIZE, sort_value) == ([], None, None)
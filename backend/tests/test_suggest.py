@@ -0,0 +1,110 @@
+"""main.py：rsID / 位置前缀提示索引"""
+
+import numpy as np
+import pytest
+
+from main import SNPModel, SuggestIndex, position_prefix_bounds, suggest_positions_sql
+
+SNPS = [
+    # (id, chrom, pos, rs_id)
+    (1, "1", 7, "rs7"),
+    (2, "1", 19, "rs19"),
+    (3, "1", 197, "rs197"),
+    (4, "1", 1997, "rs1997"),
+    (5, "1", 1997, None),
+    (6, "1", 19970, "rs19970"),
+    (7, "1", 19979, "rs1998"),
+    (8, "1", 199700, "rs2"),
+    (9, "1", 1200000, "rs12"),
+    (10, "1", 2000000, "rs120"),
+    (11, "X", 1997, "rs1997x"),
+]
+
+
+def build_index(snps=SNPS) -> SuggestIndex:
+    """与 SuggestIndex.build 相同的数组布局：rsID 按字节序，位置按 (pos, id) 排序"""
+    keyed = sorted((rs_id.encode(), snp_id) for snp_id, _, _, rs_id in snps if rs_id)
+    rs_keys = np.array([key for key, _ in keyed], dtype="S")
+    rs_snp_ids = np.array([snp_id for _, snp_id in keyed], dtype=np.int32)
+    positions = {}
+    for chrom in {snp[1] for snp in snps}:
+        rows = sorted((pos, snp_id) for snp_id, c, pos, _ in snps if c == chrom)
+        positions[chrom] = (
+            np.array([pos for pos, _ in rows], dtype=np.int64),
+            np.array([snp_id for _, snp_id in rows], dtype=np.int32)
+        )
+    return SuggestIndex(1, rs_keys, rs_snp_ids, positions)
+
+
+def values(suggestions: list) -> list:
+    return [s["value"] for s in suggestions]
+
+
+# ============================================
+# position_prefix_bounds
+# ============================================
+def test_prefix_bounds_grow_by_decimal_digit():
+    assert position_prefix_bounds("1997", 1000000) == [(1997, 1998), (19970, 19980), (199700, 199800)]
+    assert position_prefix_bounds("5", 49) == [(5, 6)]
+    assert position_prefix_bounds("5", 50) == [(5, 6), (50, 60)]
+
+
+@pytest.mark.parametrize("digits", ["", "0", "012"])
+def test_prefix_bounds_empty_for_blank_or_leading_zero(digits):
+    assert position_prefix_bounds(digits, 10 ** 9) == []
+
+
+def test_prefix_bounds_are_capped():
+    assert len(position_prefix_bounds("1", 10 ** 30)) == 20
+
+
+# ============================================
+# SuggestIndex
+# ============================================
+def test_suggest_positions_shorter_positions_first():
+    index = build_index()
+    assert values(index.suggest_positions("1", "1997", 10)) == [
+        "1:1997", "1:1997", "1:19970", "1:19979", "1:199700"
+    ]
+    assert [s["snp_id"] for s in index.suggest_positions("1", "1997", 2)] == [4, 5]
+    assert values(index.suggest_positions("1", "12", 10)) == ["1:1200000"]
+    assert values(index.suggest_positions("X", "1997", 10)) == ["X:1997"]
+
+
+def test_suggest_positions_respects_limit_across_ranges():
+    index = build_index()
+    assert values(index.suggest_positions("1", "19", 3)) == ["1:19", "1:197", "1:1997"]
+    assert len(index.suggest_positions("1", "1", 4)) == 4
+
+
+@pytest.mark.parametrize("chrom, digits", [("1", "0"), ("1", "012"), ("1", "3"), ("2", "1")])
+def test_suggest_positions_no_match(chrom, digits):
+    assert build_index().suggest_positions(chrom, digits, 10) == []
+
+
+def test_suggest_positions_without_digits_lists_the_chromosome():
+    assert values(build_index().suggest_positions("1", "", 3)) == ["1:7", "1:19", "1:197"]
+
+
+def test_suggest_rs_ids_bytewise_prefix_order():
+    index = build_index()
+    assert values(index.suggest_rs_ids("rs199", 10)) == ["rs1997", "rs19970", "rs1997x", "rs1998"]
+    assert values(index.suggest_rs_ids("rs12", 10)) == ["rs12", "rs120"]
+    assert index.suggest_rs_ids("rs12", 1) == [{"type": "rs_id", "value": "rs12", "snp_id": 9}]
+    assert index.suggest_rs_ids("", 10) == []
+    assert index.suggest_rs_ids("rs3", 10) == []
+
+
+def test_suggest_positions_match_sql_fallback(sqlite_session):
+    db = sqlite_session(SNPModel)
+    for snp_id, chrom, pos, rs_id in SNPS:
+        db.add(SNPModel(id=snp_id, chrom=chrom, pos=pos, rs_id=rs_id, ref_allele="A", alt_allele="G", max_abs_sad=0))
+    db.commit()
+
+    index = build_index()
+    prefixes = [""] + [str(n) for n in range(0, 200)] + ["1997", "19970", "199700", "1200000", "2000000", "012"]
+    for chrom in ("1", "X", "2"):
+        for digits in prefixes:
+            for limit in (1, 3, 10):
+                assert index.suggest_positions(chrom, digits, limit) == \
+                    suggest_positions_sql(db, chrom, digits, limit), (chrom, digits, limit)
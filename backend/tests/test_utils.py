@@ -0,0 +1,30 @@
+"""utils.py：COPY 字段编码与文件哈希"""
+
+import hashlib
+
+from utils import compute_file_hash, copy_field
+
+
+def test_copy_field_encodes_none_as_null_marker():
+    assert copy_field(None) == '\\N'
+
+
+def test_copy_field_escapes_copy_text_specials():
+    assert copy_field('a\tb\nc\rd\\e') == 'a\\tb\\nc\\rd\\\\e'
+    # A literal "\N" string must not be read back as NULL
+    assert copy_field('\\N') == '\\\\N'
+
+
+def test_copy_field_formats_numbers_with_str():
+    assert copy_field(12) == '12'
+    assert copy_field(0.5) == '0.5'
+
+
+def test_compute_file_hash_matches_sha256_across_blocks(tmp_path):
+    path = tmp_path / "data.bin"
+    data = bytes(range(256)) * 1000
+    path.write_bytes(data)
+
+    expected = hashlib.sha256(data).hexdigest()
+    assert compute_file_hash(str(path)) == expected
+    assert compute_file_hash(str(path), block_size=1000) == expected
@@ -0,0 +1,49 @@
+"""
+============================================
+Shared Helpers for Import Scripts and the API
+导入脚本与后端API共用的小工具
+============================================
+
+Kept free of database sessions, logging setup and other module-level side
+effects so any script can import it cheaply.
+"""
+
+import hashlib
+
+
+# ============================================
+# Files
+# ============================================
+def compute_file_hash(file_path: str, block_size: int = 8 * 1024 * 1024) -> str:
+    """计算源文件的 SHA-256，用于识别同一份输入（断点续传、GTF 缓存）"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ============================================
+# PostgreSQL
+# ============================================
+def copy_field(value) -> str:
+    """将值编码为 COPY text 格式的字段，None 编码为 \\N"""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def effects_partitioned(cursor) -> bool:
+    """snp_effects 是否为按 chrom 分区的表（新 schema）；旧库为普通表"""
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('snp_effects')
+        )
+    """)
+    return cursor.fetchone()[0]
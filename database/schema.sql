@@ -12,8 +12,13 @@
 -- 5. Better concurrency handling for scientific data queries
 
 -- Drop existing tables (for clean reinstall)
+DROP TABLE IF EXISTS snp_effect_vectors CASCADE;
+DROP TABLE IF EXISTS target_index_versions CASCADE;
 DROP TABLE IF EXISTS snp_effects CASCADE;
 DROP TABLE IF EXISTS snp_effect_summary CASCADE;
+DROP TABLE IF EXISTS target_effect_counts CASCADE;
+DROP TABLE IF EXISTS snp_annotations CASCADE;
+DROP TABLE IF EXISTS dataset_statistics CASCADE;
 DROP TABLE IF EXISTS targets CASCADE;
 DROP TABLE IF EXISTS snps CASCADE;
 
@@ -45,6 +50,7 @@ CREATE TABLE snps (
     ref_allele VARCHAR(10) NOT NULL,  -- Reference allele
     alt_allele VARCHAR(10) NOT NULL,  -- Alternative allele
     max_abs_sad FLOAT NOT NULL,  -- Maximum absolute SAD value
+    effect_hash BIGINT,          -- Fingerprint of rs_id, max_abs_sad and effect vector (delta imports)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT unique_snp UNIQUE (chrom, pos, ref_allele, alt_allele)
@@ -59,38 +65,95 @@ CREATE EXTENSION IF NOT EXISTS pg_trgm;  -- For fuzzy text search
 -- Table 3: snp_effects
 -- Stores effect values for each SNP-target combination
 -- 存储每个SNP对每个靶点的效应值
+--
+-- List-partitioned by chromosome (chrom is copied from snps). import_data.py
+-- creates one partition per chromosome (snp_effects_chr_<chrom>) on demand;
+-- unplaced scaffolds land in snp_effects_default. Dropping or reloading one
+-- chromosome is a partition drop (backend/partition_effects.py), not a DELETE.
+-- Databases created before partitioning can be converted with
+-- `python backend/partition_effects.py migrate`.
 -- ============================================
 CREATE TABLE snp_effects (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     snp_id INTEGER NOT NULL REFERENCES snps(id) ON DELETE CASCADE,
     target_id INTEGER NOT NULL REFERENCES targets(id) ON DELETE CASCADE,
+    chrom VARCHAR(10) NOT NULL,
     effect_value FLOAT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT unique_snp_target UNIQUE (snp_id, target_id)
+    PRIMARY KEY (chrom, id),
+    CONSTRAINT unique_snp_target UNIQUE (chrom, snp_id, target_id)
+) PARTITION BY LIST (chrom);
+
+CREATE TABLE snp_effects_default PARTITION OF snp_effects DEFAULT;
+
+-- ============================================
+-- Table 4: target_index_versions
+-- Ordered target id lists that packed effect vectors are laid out by
+-- 效应值向量的靶点顺序（带版本号，已发布的版本不再修改）
+-- ============================================
+CREATE TABLE target_index_versions (
+    version SERIAL PRIMARY KEY,
+    target_ids INTEGER[] NOT NULL UNIQUE,   -- target_ids[i] is the target of effect_values[i]
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ============================================
+-- Table 5: snp_effect_vectors
+-- Packed alternative to snp_effects: one float32 vector per SNP
+-- 按SNP打包存储的效应值向量（snp_effects 的替代存储），缺失值为 NULL
+-- ============================================
+CREATE TABLE snp_effect_vectors (
+    snp_id INTEGER PRIMARY KEY REFERENCES snps(id) ON DELETE CASCADE,
+    target_index_version INTEGER NOT NULL REFERENCES target_index_versions(version),
+    effect_values REAL[] NOT NULL
+);
+
+-- ============================================
+-- Table 6: snp_effect_summary
+-- Per-SNP effect statistics, maintained incrementally by import_data.py
+-- for the SNPs written in each chunk (no full refresh needed)
+-- 每个SNP的效应值汇总，导入时按数据块增量维护
+-- ============================================
+CREATE TABLE snp_effect_summary (
+    snp_id INTEGER PRIMARY KEY REFERENCES snps(id) ON DELETE CASCADE,
+    total_targets INTEGER NOT NULL DEFAULT 0,
+    mean_effect FLOAT,
+    std_effect FLOAT,
+    min_effect FLOAT,
+    max_effect FLOAT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ============================================
+-- Table 7: target_effect_counts
+-- Number of effect values per target, recomputed at the end of every import;
+-- the API ranks targets by it to pick the list preview columns
+-- 每个靶点的效应值个数（导入结束时重算），用于列表预览的常见靶点排序
+-- ============================================
+CREATE TABLE target_effect_counts (
+    target_id INTEGER PRIMARY KEY REFERENCES targets(id) ON DELETE CASCADE,
+    effect_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- ============================================
--- Materialized View: snp_effect_summary
--- Pre-computed summary for quick queries
--- 预计算汇总视图，用于快速查询
--- ============================================
-CREATE MATERIALIZED VIEW snp_effect_summary AS
-SELECT
-    s.id AS snp_id,
-    s.chrom,
-    s.pos,
-    s.rs_id,
-    s.ref_allele,
-    s.alt_allele,
-    s.max_abs_sad,
-    COUNT(e.id) AS total_targets,
-    AVG(e.effect_value) AS mean_effect,
-    STDDEV(e.effect_value) AS std_effect,
-    MIN(e.effect_value) AS min_effect,
-    MAX(e.effect_value) AS max_effect
-FROM snps s
-LEFT JOIN snp_effects e ON s.id = e.snp_id
-GROUP BY s.id;
+-- Table 8: snp_annotations
+-- Nearest gene and exon/intron region of every SNP, computed after each
+-- import by backend/annotate_snps.py (rows of an older GTF import carry an
+-- older annotation_version and are recomputed)
+-- 每个SNP的最近基因、距离与所在区域，导入后由 annotate_snps.py 计算
+-- ============================================
+CREATE TABLE snp_annotations (
+    snp_id INTEGER PRIMARY KEY REFERENCES snps(id) ON DELETE CASCADE,
+    gene_id VARCHAR(50),            -- Nearest gene; NULL when the chromosome has no genes
+    gene_name VARCHAR(255),
+    gene_biotype VARCHAR(100),
+    location VARCHAR(10),           -- within, nearby
+    distance BIGINT,                -- 0 inside the gene
+    region_type VARCHAR(20) NOT NULL,  -- exon, intron, intergenic
+    exon_number INTEGER,
+    annotation_version BIGINT NOT NULL  -- annotation_version.version the row was computed from
+);
 
 -- ============================================
 -- Indexes for Performance Optimization
@@ -100,6 +163,8 @@ GROUP BY s.id;
 -- snps table indexes
 CREATE INDEX idx_snps_chrom_pos ON snps(chrom, pos);
 CREATE INDEX idx_snps_rs_id ON snps(rs_id) WHERE rs_id IS NOT NULL;
+-- Prefix search (rs_id LIKE 'rs110%') regardless of the database collation
+CREATE INDEX idx_snps_rs_id_pattern ON snps(rs_id text_pattern_ops) WHERE rs_id IS NOT NULL;
 CREATE INDEX idx_snps_max_abs_sad ON snps(max_abs_sad DESC);
 CREATE INDEX idx_snps_chrom_pos_ref_alt ON snps(chrom, pos, ref_allele, alt_allele);
 
@@ -108,6 +173,20 @@ CREATE INDEX idx_snp_effects_snp_id ON snp_effects(snp_id);
 CREATE INDEX idx_snp_effects_target_id ON snp_effects(target_id);
 CREATE INDEX idx_snp_effects_value ON snp_effects(effect_value);
 
+-- snp_effect_summary indexes (sortable statistics)
+CREATE INDEX idx_snp_effect_summary_mean ON snp_effect_summary(mean_effect);
+CREATE INDEX idx_snp_effect_summary_std ON snp_effect_summary(std_effect);
+CREATE INDEX idx_snp_effect_summary_max ON snp_effect_summary(max_effect);
+
+-- target_effect_counts index (ranking)
+CREATE INDEX idx_target_effect_counts_count ON target_effect_counts(effect_count DESC);
+
+-- snp_annotations indexes (GET /snps filters, paged by snp_id)
+CREATE INDEX idx_snp_annotations_gene_id ON snp_annotations(gene_id, snp_id);
+CREATE INDEX idx_snp_annotations_gene_name ON snp_annotations(gene_name, snp_id);
+CREATE INDEX idx_snp_annotations_biotype ON snp_annotations(gene_biotype, snp_id);
+CREATE INDEX idx_snp_annotations_region ON snp_annotations(region_type, snp_id);
+
 -- For full-text search on rs_id
 CREATE INDEX idx_snps_rs_id_trgm ON snps USING gin(rs_id gin_trgm_ops);
 
@@ -115,11 +194,24 @@ CREATE INDEX idx_snps_rs_id_trgm ON snps USING gin(rs_id gin_trgm_ops);
 -- Functions for common operations
 -- ============================================
 
--- Function to refresh materialized view
+-- Function to rebuild snp_effect_summary from scratch (imports maintain it per chunk;
+-- `import_data.py --refresh-views` does the same rebuild)
 CREATE OR REPLACE FUNCTION refresh_summary_view()
 RETURNS void AS $$
 BEGIN
-    REFRESH MATERIALIZED VIEW snp_effect_summary;
+    TRUNCATE snp_effect_summary;
+    INSERT INTO snp_effect_summary
+        (snp_id, total_targets, mean_effect, std_effect, min_effect, max_effect, updated_at)
+    SELECT s.id, COUNT(x.v), AVG(x.v), STDDEV(x.v), MIN(x.v), MAX(x.v), CURRENT_TIMESTAMP
+    FROM snps s
+    LEFT JOIN snp_effect_vectors ev ON ev.snp_id = s.id
+    LEFT JOIN LATERAL (
+        SELECT unnest(ev.effect_values)::float8 AS v WHERE ev.snp_id IS NOT NULL
+        UNION ALL
+        SELECT e.effect_value FROM snp_effects e
+        WHERE ev.snp_id IS NULL AND e.snp_id = s.id AND e.chrom = s.chrom
+    ) x ON true
+    GROUP BY s.id;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -176,17 +268,82 @@ CREATE TABLE IF NOT EXISTS DATA_IMPORT_LOG (
     id SERIAL PRIMARY KEY,
     import_type VARCHAR(50) NOT NULL,
     source_file VARCHAR(500),
+    source_hash VARCHAR(64),     -- SHA-256 of the source file, used to resume imports
     records_processed INTEGER DEFAULT 0,
-    status VARCHAR(20) DEFAULT 'pending',
+    status VARCHAR(30) DEFAULT 'pending',  -- running, completed, completed_with_errors, failed
     error_message TEXT,
     started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP
 );
 
+-- Chunk-level checkpoints for resumable imports
+-- 分块检查点，用于断点续传
+CREATE TABLE IF NOT EXISTS DATA_IMPORT_CHECKPOINTS (
+    id BIGSERIAL PRIMARY KEY,
+    import_log_id INTEGER NOT NULL REFERENCES DATA_IMPORT_LOG(id) ON DELETE CASCADE,
+    source_hash VARCHAR(64) NOT NULL,
+    start_offset BIGINT NOT NULL,   -- Byte offset of the first row in the chunk
+    end_offset BIGINT NOT NULL,     -- Byte offset just past the last row in the chunk
+    start_row BIGINT NOT NULL,
+    end_row BIGINT NOT NULL,
+    rows_committed INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'committed',  -- committed, quarantined
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_checkpoints_hash ON DATA_IMPORT_CHECKPOINTS(source_hash, start_offset);
+
+-- Dataset version, incremented by every import; derived artifacts (e.g. the effect matrix) record it
+-- 数据集版本号，每次导入后递增，用于判断导出的矩阵等派生数据是否过期
+CREATE TABLE IF NOT EXISTS DATASET_VERSION (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO DATASET_VERSION (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+-- Annotation version, incremented by every GTF import; the API reloads its gene index when it changes
+-- 基因注释版本号，每次导入 GTF 后递增，API 据此重新加载内存中的基因区间索引
+CREATE TABLE IF NOT EXISTS ANNOTATION_VERSION (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    source_cache VARCHAR(1024),     -- GTF columnar cache matching the tables' id order (import_gtf.py --replace)
+    source_checksum VARCHAR(64),    -- SHA-256 of the GTF the cache was parsed from
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO ANNOTATION_VERSION (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+-- Dataset statistics served by GET /stats, rewritten at the end of every import
+-- 数据集统计信息（单行），每次导入结束时重算，供 /stats 直接读取
+CREATE TABLE IF NOT EXISTS DATASET_STATISTICS (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    dataset_version BIGINT NOT NULL DEFAULT 0,
+    total_snps BIGINT NOT NULL DEFAULT 0,
+    total_targets INTEGER NOT NULL DEFAULT 0,
+    total_effect_records BIGINT NOT NULL DEFAULT 0,
+    chrom_snp_counts JSONB NOT NULL DEFAULT '{}',   -- {"1": 123, "X": 45, ...}
+    min_max_abs_sad FLOAT,
+    max_max_abs_sad FLOAT,
+    min_effect_value FLOAT,
+    max_effect_value FLOAT,
+    data_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP   -- When the data last changed
+);
+
+-- Indexes / foreign keys dropped by `import_data.py --bulk-load`, kept until they are rebuilt
+-- 批量导入期间删除的索引和外键定义，重建完成后删除
+CREATE TABLE IF NOT EXISTS DATA_IMPORT_BULK_STATE (
+    object_name VARCHAR(255) PRIMARY KEY,
+    object_type VARCHAR(20) NOT NULL,   -- index, foreign_key
+    table_name VARCHAR(255) NOT NULL,
+    definition TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Comments for documentation
 COMMENT ON TABLE snps IS 'Stores SNP basic information from cattle variants';
 COMMENT ON TABLE targets IS 'Stores tissue/cell type information (578 targets)';
 COMMENT ON TABLE snp_effects IS 'Stores effect values for SNP-target combinations';
 COMMENT ON TABLE snp_effect_summary IS 'Pre-computed summary statistics for quick queries';
+COMMENT ON TABLE target_effect_counts IS 'Effect value count per target, recomputed after each import';
 COMMENT ON COLUMN snps.max_abs_sad IS 'Maximum absolute SAD (Signal Aberration Deviation) value across all targets';
 COMMENT ON COLUMN snp_effects.effect_value IS 'Normalized effect value (norRPKM) for specific SNP-target combination';
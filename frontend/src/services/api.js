@@ -48,6 +48,11 @@ export const snpApi = {
    * @param {string} params.sort_by - Sort field (default: 'id')
    * @param {string} params.sort_order - Sort direction: 'asc' or 'desc' (default: 'asc')
    * @param {number} params.top_n - Top N effect values to include (default: 10)
+   * @param {string} params.cursor - Keyset cursor (next_cursor / prev_cursor of a previous response); page is ignored
+   * @param {boolean} params.include_total - Whether to return the total count (default: true)
+   * @param {string} params.gene - Nearest gene (gene_id or gene name)
+   * @param {string} params.gene_biotype - Biotype of the nearest gene (e.g. 'protein_coding')
+   * @param {string} params.region_type - 'exon', 'intron' or 'intergenic'
    */
   getList(params) {
     return apiClient.get('/snps', { params })
@@ -57,9 +62,12 @@ export const snpApi = {
    * Search SNPs by query
    * @param {string} query - Search query (chr:position or rsID)
    * @param {Object} params - Additional parameters
+   * @param {string} params.mode - rsID matching: 'auto' (default), 'exact', 'prefix' or 'fuzzy'
    * @param {number} params.page - Page number
    * @param {number} params.page_size - Items per page
    * @param {number} params.top_n - Top N effect values to include
+   * @param {string} params.cursor - Keyset cursor (next_cursor / prev_cursor of a previous response)
+   * @param {boolean} params.include_total - Whether to return the total match count (default: true)
    */
   search(query, params = {}) {
     return apiClient.get('/snps/search', {
@@ -67,6 +75,26 @@ export const snpApi = {
     })
   },
 
+  /**
+   * Typeahead suggestions for a partially typed rsID or chr:position
+   * @param {string} query - rsID prefix (e.g. 'rs4654') or chr:position prefix (e.g. 'chr1:1997')
+   * @param {number} limit - Maximum number of suggestions (default: 10)
+   */
+  suggest(query, limit = 10) {
+    return apiClient.get('/snps/suggest', {
+      params: { query, limit }
+    })
+  },
+
+  /**
+   * Bulk lookup of rsIDs and/or chrom:pos[:ref:alt] keys (NDJSON or TSV response body)
+   * @param {string[]} variants - Variant keys
+   * @param {Object} options - { targets: target names (default: all), format: 'ndjson' | 'tsv' }
+   */
+  batchLookup(variants, options = {}) {
+    return apiClient.post('/snps/batch', { variants, ...options }, { responseType: 'text' })
+  },
+
   /**
    * Get SNP detail by ID
    * @param {number} id - SNP ID
@@ -108,6 +136,26 @@ export const genomicsApi = {
   }
 }
 
+/**
+ * Bulk export (streamed by the server, so downloaded through a plain link)
+ */
+export const exportApi = {
+  /**
+   * Build the download URL of an export
+   * @param {Object} params - { format: 'tsv' | 'tsv.gz' | 'ndjson' | 'parquet', chrom, start, end,
+   *   min_max_abs_sad, targets: comma-separated target names ('' for SNP columns only) }
+   */
+  getUrl(params = {}) {
+    const query = new URLSearchParams()
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && !(value === '' && key !== 'targets')) {
+        query.append(key, value)
+      }
+    })
+    return `${API_BASE_URL}/export?${query.toString()}`
+  }
+}
+
 /**
  * Statistics API
  */